@@ -14,14 +14,14 @@ def input_check(flatline, sudoku, iterable=SIMPLE_SUDOKU + HARD_SUDOKU):
 def solve_normal(flatline=None, sudoku=None):
     # If nothing is provided, we automatically get a normal sudoku.
     flatline, sudoku = input_check(flatline, sudoku)
-    solver = Backtracking(flatline, sudoku)
+    solver = Backtracking(flatline, sudoku, progress=True)
     solver.run()
     solver.show()
 
 
 def solve_knight_move_constraint(flatline=None, sudoku=None):
     flatline, sudoku = input_check(flatline, sudoku, KNIGHT_CONSTRAINT)
-    solver = Backtracking(flatline, sudoku)
+    solver = Backtracking(flatline, sudoku, progress=True)
     solver.add_knight_move_constraint()
     solver.run()
     solver.show()
@@ -29,7 +29,7 @@ def solve_knight_move_constraint(flatline=None, sudoku=None):
 
 def solve_kings_move_constraint(flatline=None, sudoku=None):
     flatline, sudoku = input_check(flatline, sudoku, KINGS_MOVE_CONSTRAINT)
-    solver = Backtracking(flatline, sudoku)
+    solver = Backtracking(flatline, sudoku, progress=True)
     solver.add_kings_move_constraint()
     solver.run()
     solver.show()
@@ -37,7 +37,7 @@ def solve_kings_move_constraint(flatline=None, sudoku=None):
 
 def solve_non_consecutive_constraint(flatline=None, sudoku=None):
     flatline, sudoku = input_check(flatline, sudoku, NON_CONSECUTIVE_CONSTRAINT)
-    solver = Backtracking(flatline, sudoku)
+    solver = Backtracking(flatline, sudoku, progress=True)
     solver.add_non_consecutive_constraint()
     solver.run()
     solver.show()
@@ -45,7 +45,7 @@ def solve_non_consecutive_constraint(flatline=None, sudoku=None):
 
 def solve_miracle(flatline=None, sudoku=None):
     flatline, sudoku = input_check(flatline, sudoku, MIRACLE)
-    solver = Backtracking(flatline, sudoku)
+    solver = Backtracking(flatline, sudoku, progress=True)
 
     solver.add_knight_move_constraint()
     solver.add_kings_move_constraint()
@@ -1,16 +1,19 @@
-from tqdm import tqdm
+from contextlib import contextmanager
 from typing import Union, Tuple
 
 from sudoku.base_solver import BaseSolver
+from sudoku.peers import SYMBOLS, constraint_peers, layout
+from sudoku.stats import Progress
 from sudoku.sudoku_wrapper import Sudoku
 
 
 class Backtracking(BaseSolver):
-    def __init__(self, flatline=None, sudoku=None):
+    def __init__(self, flatline=None, sudoku=None, progress=False):
         super().__init__(flatline, sudoku)
         self.constraints = []
+        self.show_progress = progress  # Only interactive use draws a progress bar, see `progress_bar`.
         self.progressbar = None
-        self.count = 0
+        self.current = self.sudoku.flatline  # The flatline of the current search node, shown by the progress bar.
 
     def verify(self, flatline: str) -> bool:
         """ Returns True if the sudoku is a valid solution.  """
@@ -20,40 +23,35 @@ class Backtracking(BaseSolver):
 
     def constraint_column(self, flatline: str) -> bool:
         """ Hard constraint that must be met in order to solve the sudoku.  """
-        return all(len(set(flatline[idx::9])) == 9 for idx in range(9))
+        size = self.sudoku.size
+        return all(len(set(flatline[idx::size])) == size for idx in range(size))
 
     def constraint_row(self, flatline: str) -> bool:
         """ Hard constraint that must be met in order to solve the sudoku.  """
-        return all(len(set(flatline[idx:idx + 9])) for idx in range(0, 81, 9))
+        size = self.sudoku.size
+        return all(len(set(flatline[idx:idx + size])) == size for idx in range(0, len(flatline), size))
 
     def constraint_box(self, flatline: str) -> bool:
         """ Hard constraint that must be met in order to solve the sudoku.  """
-        indices = [0, 1, 2, 9, 10, 11, 18, 19, 20]
-        for row in range(0, 9, 3):
-            for column in range(0, 81, 27):
-                if not len(set(flatline[i + row + column] for i in indices)) == 9:
-                    return False
-        return True
+        size = self.sudoku.size
+        return all(len(set(flatline[i] for i in unit)) == size for unit in self.sudoku.layout.units[2 * size:])
 
     def valid(self, flatline: str, value: str, row: int, column: int) -> bool:
         """ Soft constraint, that verifies that the value only occurs ones in the row, columns or box.  """
+        box = self.sudoku.box
+        size = box * box
 
         # Value only occurs once in the row.
-        if not sum(1 for number in flatline[row * 9: row * 9 + 9] if number == value) == 1:
+        if not sum(1 for number in flatline[row * size: row * size + size] if number == value) == 1:
             return False
 
         # Value only occurs once in the column.
-        if not sum(1 for number in flatline[column::9] if number == value) == 1:
+        if not sum(1 for number in flatline[column::size] if number == value) == 1:
             return False
 
         # Value only occurs once in the box.
-        indices = [0, 1, 2, 9, 10, 11, 18, 19, 20]
-        count = 0
-        for index in indices:
-            for number in flatline[index + (row // 3) * 27 + (column // 3) * 3]:
-                if number == value:
-                    count += 1
-        if count != 1:
+        unit = layout(box).units[2 * size + (row // box) * box + column // box]
+        if sum(1 for index in unit if flatline[index] == value) != 1:
             return False
 
         # Value only occurs once in the extra set of constraint.
@@ -65,15 +63,12 @@ class Backtracking(BaseSolver):
     def verify_extra_constraints(self, flatline: str, value: str, row: int, column: int, constraint: str) -> bool:
         """ Verify extra sudoku constraints.  """
 
-        row, column = self.sudoku.rows[int(row)], str(int(column) + 1)
-        for neighbour in self.sudoku.constraint_cells(name=constraint, row=row, column=column):
-            row_, column_ = neighbour
-            row_, column_ = self.sudoku.rows.index(row_), int(column_) - 1
+        for neighbour in constraint_peers(constraint, self.sudoku.box)[row * self.sudoku.size + column]:
             if constraint != 'consecutive':
-                if flatline[row_ * 9 + column_] == value:
+                if flatline[neighbour] == value:
                     return False
-            elif flatline[row_ * 9 + column_] != '.':
-                if abs(int(flatline[row_ * 9 + column_]) - int(value)) == 1:
+            elif flatline[neighbour] != '.':
+                if abs(SYMBOLS.index(flatline[neighbour]) - SYMBOLS.index(value)) == 1:
                     return False
         return True
 
@@ -86,45 +81,84 @@ class Backtracking(BaseSolver):
     def add_non_consecutive_constraint(self):
         self.constraints.append('consecutive')
 
-    def run(self) -> Sudoku:
-        """ Returns a solved sudoku.  """
-        with tqdm(range(1, 81 + 1), unit='digits', leave=True) as self.progressbar:
+    def run(self, timeout=None, budget=None) -> Sudoku:
+        """ Returns a solved sudoku, see `BaseSolver.run` for the limits.  """
+        self.current = self.sudoku.flatline
+        with self.running(timeout, budget), self.progress_bar():
             solved = self.backtracking(self.sudoku.flatline)
 
         if not solved:
-            print(f"\n\n[!] No solution was found using backtracking!")
-        self.solved = self.solved if solved else self.sudoku
+            raise ValueError("Sudoku is not solvable\n")
         return self.solved
 
-    def show(self, n=3):
+    @contextmanager
+    def progress_bar(self):
+        """ Draws a tqdm bar fed by a `Progress` thread during the run, does nothing unless `show_progress` is set.  """
+        if not self.show_progress:
+            yield
+            return
+
+        from tqdm import tqdm
+
+        with tqdm(range(1, len(self.sudoku.cells) + 1), unit='digits', leave=True) as self.progressbar, \
+                Progress(self.progressbar, self.progress):
+            yield
+
+    def show(self, n=None):
         """ Renders the start and solved sudoku.  """
+        n = n or self.sudoku.box
+        if self.solved is None:
+            print("\n\nBegin state of the Sudoku, no solution was found\n")
+            self.render(self.sudoku.flatline, n=n)
+            return
         print(f"\n\nBegin state and solved state of the Sudoku (valid={self.solved.validate_solution()})\n")
         self.render(self.sudoku.flatline, self.solved.flatline, n=n)
 
     def backtracking(self, flatline: str) -> bool:
         """ backtracking algorithm to solve the sudoku, final return should be True if a solution was found.  """
+        self.spend()
         current = self.find_empty(flatline)
         if current is None:
             self.solved = Sudoku(flatline)
             return True
 
-        for guess in '123456789':
-            idx, row, column = current
-            self.update(idx, flatline)
-
+        idx, row, column = current
+        stats = self.stats
+        for guess in SYMBOLS[:self.sudoku.size]:
             flatline = self.replace(flatline, idx, guess)
             if self.valid(flatline, guess, row, column):
-                self.progressbar.update(1)
+                if stats is not None:
+                    stats.guesses += 1
+                self.current = flatline
 
                 if self.backtracking(flatline):
                     return True
+                if stats is not None:
+                    stats.backtracks += 1
             flatline = self.replace(flatline, idx, '.')
         return False
 
+    def iter_solutions(self):
+        """ Yields every solution as a new Sudoku instance.  """
+        yield from self.backtracking_all(self.sudoku.flatline)
+
+    def backtracking_all(self, flatline: str):
+        """ backtracking algorithm that continues after a solution is found, yields every solution.  """
+        current = self.find_empty(flatline)
+        if current is None:
+            yield Sudoku(flatline)
+            return
+
+        idx, row, column = current
+        for guess in SYMBOLS[:self.sudoku.size]:
+            candidate = self.replace(flatline, idx, guess)
+            if self.valid(candidate, guess, row, column):
+                yield from self.backtracking_all(candidate)
+
     def find_empty(self, flatline: str) -> Union[None, Tuple[int, int, int]]:
         for idx, value in enumerate(flatline):
             if value == '.':
-                row, column = divmod(idx, 9)
+                row, column = divmod(idx, self.sudoku.size)
                 return idx, row, column
         return None
 
@@ -133,10 +167,7 @@ class Backtracking(BaseSolver):
         flatline = f"{flatline[:idx]}{value}{flatline[idx + 1:]}"
         return flatline
 
-    def update(self, n, flatline):
-        if self.progressbar is not None:
-            self.count += 1
-            self.progressbar.n = n
-
-            if self.count % 1000 == 0:
-                self.progressbar.set_postfix({'last attempt': flatline})
+    def progress(self):
+        """ The number of filled cells and the flatline of the current search node, polled by the progress bar.  """
+        current = self.current
+        return len(current) - current.count('.'), {'last attempt': current}
@@ -4,8 +4,26 @@
 
 """
 
+import time
+
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+
+from sudoku.stats import Stats
 from sudoku.sudoku_wrapper import Sudoku
 
+# Status of a `BaseSolver.attempt`, unknown when the time or budget ran out before an answer was found.
+SOLVED, UNSATISFIABLE, UNKNOWN = 'solved', 'unsatisfiable', 'unknown'
+
+Result = namedtuple('Result', ['status', 'solved', 'seconds', 'reason', 'stats'])
+Result.__doc__ = """ The outcome of a limited run, `solved` is only set for status SOLVED and `reason` only for UNKNOWN.
+    `stats` is None unless statistics are enabled, see `BaseSolver.enable_stats`.  """
+
+
+class BudgetExceeded(TimeoutError):
+    """ Raised by `run` when the timeout or budget is used up before the puzzle was solved or proven unsolvable.  """
+
 
 class BaseSolver:
     """
@@ -16,17 +34,124 @@ class BaseSolver:
 
 
     """
+    deadline = None  # The `time.perf_counter` at which the current run times out, None without a timeout.
+    budget = None  # The number of search steps left in the current run, None without a budget.
+    stats = None  # Statistics of the last run, only collected after `enable_stats`.
+    build_seconds = 0.0  # Time spent building the model, the rules and extra constraints.
 
     def __init__(self, flatline=None, sudoku=None):
         assert not (flatline is not None and sudoku is not None), "Only give a flatline or initialized Sudoku instance."
-        self.sudoku = Sudoku(flatline)
-        if sudoku is not None:
-            self.sudoku = sudoku
+        self.sudoku = sudoku if sudoku is not None else Sudoku(flatline)
+        self.solved = None  # The solved Sudoku, None until a run finds a solution.
+
+    def add_knight_move_constraint(self):
+        """ Two cells that are a knight move away have to be different.  """
+        raise NotImplementedError
+
+    def add_kings_move_constraint(self):
+        """ All the adjacent cells (including diagonal) have to be different.  """
+        raise NotImplementedError
+
+    def add_non_consecutive_constraint(self):
+        """ Two orthogonal adjacent cells, have to differ by at least 2.  (6, 7 can't be neighbours)"""
+        raise NotImplementedError
 
-    def run(self) -> Sudoku:
-        """ Run the actual solver, if successful it will return a new solved Sudoku instance.  """
+    def add_constraint(self, name):
+        """ Add an extra constraint by its `Sudoku.constraint_directions` name (knight_move, kings_move, consecutive).  """
+        methods = dict(
+                consecutive=self.add_non_consecutive_constraint,
+                kings_move=self.add_kings_move_constraint,
+                knight_move=self.add_knight_move_constraint,
+        )
+        if name not in methods:
+            raise KeyError(f"`{name}`, valid keys: " + str(list(methods)))
+        start = time.perf_counter()
+        methods[name]()
+        self.build_seconds += time.perf_counter() - start
+
+    def run(self, timeout=None, budget=None) -> Sudoku:
+        """
+            Run the actual solver, if successful it will return a new solved Sudoku instance.
+            Raises a ValueError if the puzzle is not solvable and `BudgetExceeded` if a limit is reached first.
+
+            :param timeout: float
+                Maximum number of seconds, None for no limit.
+            :param budget: int
+                Maximum amount of search work, None for no limit. The unit depends on the engine: conflicts for
+                Z3, propagations for pycosat and search nodes for the backtracking, bitmask and DLX engines.
+        """
+        raise NotImplementedError
+
+    def attempt(self, timeout=None, budget=None) -> Result:
+        """ Run the solver within the limits, see `run`, the outcome is returned as a `Result` instead of raised.  """
+        start = time.perf_counter()
+        try:
+            solved = self.run(timeout=timeout, budget=budget)
+            return Result(SOLVED, solved, time.perf_counter() - start, None, self.stats)
+        except BudgetExceeded as error:
+            return Result(UNKNOWN, None, time.perf_counter() - start, str(error), self.stats)
+        except ValueError:
+            return Result(UNSATISFIABLE, None, time.perf_counter() - start, None, self.stats)
+
+    def enable_stats(self, enabled=True):
+        """ Collect a `Stats` object on every run, available as `self.stats` after the run.  """
+        self.stats = Stats(type(self).__name__, self.build_seconds) if enabled else None
+
+    @contextmanager
+    def running(self, timeout=None, budget=None):
+        """
+            Start the limits and the statistics of a single run, yields the new `Stats` (None when disabled).
+            A budget of 0 or less raises `BudgetExceeded` right away for every engine, before any search.
+        """
+        if self.stats is not None:
+            self.stats = Stats(type(self).__name__, self.build_seconds)
+        if budget is not None and budget <= 0:
+            raise BudgetExceeded("Search budget exhausted")
+        self.limit(timeout, budget)
+        start = time.perf_counter()
+        try:
+            yield self.stats
+        finally:
+            self.limit()
+            if self.stats is not None:
+                self.stats.solve_seconds = time.perf_counter() - start
+
+    def limit(self, timeout=None, budget=None):
+        """ Start the limits of a search run, `spend` checks them, without arguments all limits are removed.  """
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+        self.budget = budget
+
+    def spend(self):
+        """ Count a single search step, raises `BudgetExceeded` once the budget or the time is used up.  """
+        if self.stats is not None:
+            self.stats.nodes += 1
+        if self.budget is not None:
+            self.budget -= 1
+            if self.budget < 0:
+                raise BudgetExceeded("Search budget exhausted")
+        self.check_deadline()
+
+    def check_deadline(self):
+        """ Raises `BudgetExceeded` once the time of the current run is used up.  """
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded("Timeout")
+
+    def iter_solutions(self):
+        """ Yields every solution as a new solved Sudoku instance.  """
         raise NotImplementedError
 
+    def count_solutions(self, limit=None) -> int:
+        """ Count the solutions, stops as soon as `limit` solutions are found (None for no limit).  """
+        return sum(1 for _ in islice(self.iter_solutions(), limit))
+
+    def run_puzzle(self, sudoku, timeout=None, budget=None) -> Sudoku:
+        """
+            Solve another puzzle with the rules and constraints that are already added to this solver.
+            Solvers only add the givens of `self.sudoku` when running, so the model is not rebuilt.
+        """
+        self.sudoku, self.solved = sudoku, None
+        return self.run(timeout=timeout, budget=budget)
+
     def render(self, flatline_init, flatline_solved=None, n=3):
         fmt = ' | '.join([' %s ' * n] * n)
         sep = ' + '.join([' - ' * n] * n)
@@ -0,0 +1,194 @@
+"""
+    Solve many Sudoku's at once, spread over multiple processes.
+
+    Puzzles are streamed from any iterable in chunks, so a worker receives a whole chunk per task and
+    the pickling cost is shared by all puzzles in the chunk. Only a bounded number of chunks is in flight
+    at any time, so arbitrarily large inputs are processed with constant memory.
+
+    > for idx, solved in solve_many(flatlines, engine=SudokuSolverBitmask, constraints=['knight_move'], workers=8):
+    >     print(idx, solved.flatline if solved is not None else 'UNSAT')
+
+"""
+
+import os
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from sudoku.base_solver import BudgetExceeded
+from sudoku.bitmask.solver import SudokuSolverBitmask
+from sudoku.cache import get_cache
+from sudoku.session import Session, get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+
+def chunked(iterable, size):
+    """ Yield the start index and a list of at most `size` consecutive elements of the iterable.  """
+    iterator, start = iter(iterable), 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def to_sudoku(puzzle):
+    """ Returns the puzzle as a Sudoku like `Session.to_sudoku`, or None when the puzzle is malformed.  """
+    try:
+        return Session.to_sudoku(puzzle)
+    except ValueError:
+        return None
+
+
+def solve_one(puzzle, engine=SudokuSolverBitmask, constraints=(), timeout=None, budget=None, cache=None):
+    """
+        Solve a single puzzle, returns the solved Sudoku or None when the puzzle is not solvable or not solved
+        within the limits.
+        The model for the engine, constraints and grid size is built once per process and reused, see `Session`.
+
+        :param puzzle: Union[str, bytes, Sudoku]
+            A flatline, raw cells (see `Sudoku.from_cells`) or an already instantiated Sudoku.
+        :param engine: Type[BaseSolver]
+            The solver class that is used.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param timeout: float
+            Maximum number of seconds for the puzzle, None for no limit.
+        :param budget: int
+            Maximum amount of search work for the puzzle, see `BaseSolver.run`.
+        :param cache: Union[bool, str]
+            Look up and store the solution in the cache of this process, True to only cache in memory or the
+            path of an SQLite file that is shared with other processes and runs, see `sudoku.cache`.
+    """
+    try:
+        sudoku = Session.to_sudoku(puzzle)
+        if cache:
+            return get_cache(None if cache is True else cache).solve(sudoku, engine, constraints, timeout, budget)
+        return get_session(engine, tuple(constraints), sudoku.box).solve(sudoku, timeout=timeout, budget=budget)
+    except (ValueError, BudgetExceeded):
+        return None
+
+
+def solve_chunk(chunk, engine=SudokuSolverBitmask, constraints=(), timeout=None, budget=None, cache=None):
+    """ Worker task, returns the solved cells (or None) and the solve time of every puzzle in the chunk.  """
+    results = []
+    for puzzle in chunk:
+        start = time.perf_counter()
+        solved = solve_one(puzzle, engine, constraints, timeout, budget, cache)
+        results.append((bytes(solved.cells) if solved is not None else None, time.perf_counter() - start))
+    return results
+
+
+def unpack(start, results, with_timing=False):
+    """ Convert the results of a worker task back to (index, Sudoku) pairs, or (index, Sudoku, seconds).  """
+    for offset, (cells, elapsed) in enumerate(results):
+        solved = Sudoku.from_cells(cells) if cells is not None else None
+        yield (start + offset, solved, elapsed) if with_timing else (start + offset, solved)
+
+
+def solve_many(puzzles, engine=SudokuSolverBitmask, constraints=(), workers=None, chunksize=64, ordered=True,
+               with_timing=False, timeout=None, budget=None, cache=None):
+    """
+        Solve every puzzle of the iterable, yields (index, solved Sudoku or None) pairs.
+        None is yielded for puzzles that are not solvable or not solved within the limits.
+
+        :param puzzles: Iterable[Union[str, bytes, Sudoku]]
+            The puzzles as flatlines, raw cells or instantiated Sudoku's, consumed lazily.
+        :param engine: Type[BaseSolver]
+            The solver class that is used, any `BaseSolver` subclass.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param workers: int
+            Number of worker processes, defaults to the number of CPUs. With 1 worker everything
+            is solved in the current process.
+        :param chunksize: int
+            Number of puzzles that are sent to a worker in a single task.
+        :param ordered: bool
+            Yield the results in input order, otherwise as soon as a chunk is finished.
+        :param with_timing: bool
+            Yield (index, solved Sudoku or None, seconds) with the solve time of every single puzzle.
+        :param timeout: float
+            Maximum number of seconds per puzzle, so a single hard puzzle can't block a worker.
+        :param budget: int
+            Maximum amount of search work per puzzle, see `BaseSolver.run`.
+        :param cache: Union[bool, str]
+            Cache the solutions, True for memory only or the path of an SQLite file, see `solve_one`.
+    """
+    args = (engine, tuple(constraints), timeout, budget, cache)
+    results = map_chunks(solve_chunk, puzzles, args, workers, chunksize, ordered)
+    for start, chunk_results in results:
+        yield from unpack(start, chunk_results, with_timing)
+
+
+def solve_deduplicated(puzzles, engine=SudokuSolverBitmask, constraints=(), workers=None, chunksize=64,
+                       batch_size=4096, with_timing=False, timeout=None, budget=None, cache=None):
+    """
+        Solve every puzzle of the iterable like `solve_many`, but equivalent puzzles (rotated, relabeled, ...,
+        see `sudoku.symmetry`) are only solved once. Yields (index, solved Sudoku or None) pairs in input order,
+        None for malformed puzzles as well.
+        With `with_timing` the solve time is counted for the first puzzle of every class, the others get 0.
+
+        Only the solutions of the current batch are kept, so memory stays constant for any input size.
+        Equivalent puzzles in different batches share a solution through the `cache`, which is keyed on the
+        canonical form as well.
+
+        :param batch_size: int
+            Number of puzzles that are read and canonicalized before their representatives are solved.
+    """
+    from sudoku.symmetry import canonical
+
+    constraints = tuple(constraints)
+    for start, batch in chunked(puzzles, batch_size):
+        sudokus = [to_sudoku(puzzle) for puzzle in batch]
+        forms = [canonical(sudoku, constraints) if sudoku is not None else (None, None) for sudoku in sudokus]
+        representatives = list(dict.fromkeys(flatline for flatline, _ in forms if flatline is not None))
+        solutions = {None: (None, 0.0)}  # Canonical flatline -> (canonical solution or None, seconds).
+        for idx, solved, elapsed in solve_many(representatives, engine, constraints, workers, chunksize, False,
+                                               True, timeout, budget, cache):
+            solutions[representatives[idx]] = solved, elapsed
+
+        for offset, (flatline, transform) in enumerate(forms):
+            solved, elapsed = solutions[flatline]
+            solutions[flatline] = solved, 0.0
+            solved = transform.restore(solved) if solved is not None else None
+            yield (start + offset, solved, elapsed) if with_timing else (start + offset, solved)
+
+
+def map_chunks(task, iterable, args=(), workers=None, chunksize=64, ordered=True):
+    """
+        Run `task(chunk, *args)` for every chunk of the iterable in a process pool, yields (start, result) pairs.
+        The task must be a module level function, so it can be pickled. See `solve_many` for the parameters.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    chunks = chunked(iterable, chunksize)
+
+    if workers <= 1:
+        for start, chunk in chunks:
+            yield start, task(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending, starts = deque(), {}
+
+        def submit(n):
+            for start, chunk in islice(chunks, n):
+                future = executor.submit(task, chunk, *args)
+                starts[future] = start
+                pending.append(future)
+
+        # Keep every worker busy with a next chunk ready, without reading the whole input upfront.
+        submit(2 * workers)
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+
+            for future in done:
+                yield starts.pop(future), future.result()
+            submit(len(done))
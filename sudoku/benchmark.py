@@ -0,0 +1,175 @@
+"""
+    Benchmark all solver engines over every category of example puzzles.
+
+    Model building (creating the solver and adding the constraints) and solving are timed separately,
+    every puzzle is repeated a number of times and the median is reported. Results can be stored as JSON
+    and compared against an earlier stored baseline to detect regressions.
+
+    > python -m sudoku bench --engines z3,bitmask --repeat 5 --save baseline.json
+    > python -m sudoku bench --engines z3,bitmask --repeat 5 --baseline baseline.json
+
+    The startup benchmark times a fresh interpreter that imports the command line modules and solves a single
+    easy puzzle, and fails when it exceeds the budget or imports a heavy module that the job doesn't need:
+
+    > python -m sudoku bench --startup --startup-budget 0.25
+
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from sudoku.engines import ENGINES, get_engine
+from sudoku.peers import valid
+from sudoku.sudoku_examples import (HARD_SUDOKU, KINGS_MOVE_CONSTRAINT, KNIGHT_CONSTRAINT, MIRACLE,
+                                    NON_CONSECUTIVE_CONSTRAINT, SIMPLE_SUDOKU, SIXTEEN, TWENTY_FIVE)
+
+MIRACLE_CONSTRAINTS = ('knight_move', 'kings_move', 'consecutive')
+
+# Category name to the puzzles and the extra constraints they are solved with.
+CATEGORIES = dict(
+        simple=(SIMPLE_SUDOKU, ()),
+        hard=(HARD_SUDOKU, ()),
+        knight=(KNIGHT_CONSTRAINT, ('knight_move',)),
+        kings=(KINGS_MOVE_CONSTRAINT, ('kings_move',)),
+        non_consecutive=(NON_CONSECUTIVE_CONSTRAINT, ('consecutive',)),
+        miracle=(MIRACLE, MIRACLE_CONSTRAINTS),
+        sixteen=(SIXTEEN, ()),
+        twenty_five=(TWENTY_FIVE, ()),
+)
+
+# Combinations that take minutes per puzzle, only run when explicitly asked for.
+SLOW = {('backtracking', 'knight'), ('backtracking', 'non_consecutive'), ('backtracking', 'miracle'),
+        ('backtracking', 'sixteen'), ('backtracking', 'twenty_five')}
+
+# Slow to import, a short job with the default engine must not load any of them.
+HEAVY_MODULES = ('z3', 'pycosat', 'tqdm', 'numpy', 'sudoku.sudoku_examples')
+
+# Run in a fresh interpreter by `time_startup`, prints the heavy modules that were imported.
+STARTUP_SCRIPT = """
+import sys
+import sudoku.cli
+from sudoku.engines import get_engine
+from sudoku.session import get_session
+get_session(get_engine({engine!r})).solve({flatline!r})
+print(','.join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def time_puzzle(engine, flatline, constraints, repeat):
+    """ Returns the build times, solve times and validity of solving a single puzzle `repeat` times.  """
+    build, solve, is_valid = [], [], True
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solver = engine(flatline=flatline)
+        for name in constraints:
+            solver.add_constraint(name)
+        built = time.perf_counter()
+        try:
+            solved = solver.run()
+        except ValueError:
+            solved = None
+        solve.append(time.perf_counter() - built)
+        build.append(built - start)
+        is_valid = is_valid and valid(solver.sudoku, solved, constraints)
+    return build, solve, is_valid
+
+
+def run_benchmark(engines=tuple(ENGINES), categories=tuple(CATEGORIES), repeat=3, generated=0, include_slow=False,
+                  log=sys.stderr):
+    """
+        Benchmark every engine on every category, returns a JSON serializable dict with the results.
+
+        :param engines: Iterable[str]
+            Names of the engines, see `sudoku.engines.ENGINES`.
+        :param categories: Iterable[str]
+            Names of the example categories, see `CATEGORIES`.
+        :param repeat: int
+            Number of times each puzzle is solved, the median time is reported.
+        :param generated: int
+            Number of generated normal puzzles with a single solution, added as the `generated` category.
+            The same puzzles are generated on every run, see `sudoku.generator.generate_many`.
+        :param include_slow: bool
+            Also run the combinations in `SLOW`, that take minutes per puzzle.
+    """
+    categories = {name: CATEGORIES[name] for name in categories}
+    if generated:
+        from sudoku.generator import generate_many
+
+        categories['generated'] = ([puzzle.flatline for puzzle, _ in generate_many(generated)], ())
+
+    results = []
+    for engine_name in engines:
+        engine = get_engine(engine_name)
+        for category, (puzzles, constraints) in categories.items():
+            if (engine_name, category) in SLOW and not include_slow:
+                continue
+
+            build_total = solve_total = 0
+            all_valid = True
+            for flatline in puzzles:
+                build, solve, is_valid = time_puzzle(engine, flatline, constraints, repeat)
+                build_total += statistics.median(build)
+                solve_total += statistics.median(solve)
+                all_valid = all_valid and is_valid
+
+            result = dict(engine=engine_name, category=category, puzzles=len(puzzles), build=build_total,
+                          solve=solve_total, total=build_total + solve_total, valid=all_valid)
+            results.append(result)
+            if log is not None:
+                print(format_result(result), file=log)
+
+    return dict(python=platform.python_version(), platform=platform.platform(), repeat=repeat, results=results)
+
+
+def time_startup(engine='bitmask', repeat=5):
+    """
+        Time a fresh interpreter that imports the package and solves one easy puzzle, as a short job or a new
+        worker process does. Returns the median wall time in seconds and the heavy modules that were imported.
+    """
+    script = STARTUP_SCRIPT.format(engine=engine, flatline=SIMPLE_SUDOKU[0], modules=HEAVY_MODULES)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    seconds, output = [], ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', script], cwd=root, check=True, capture_output=True,
+                                text=True).stdout
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds), [name for name in output.strip().split(',') if name]
+
+
+def format_result(result):
+    return (f"{result['engine']:>12} {result['category']:>16} {result['puzzles']:>5} puzzles  "
+            f"build {result['build'] * 1000:>10.2f}ms  solve {result['solve'] * 1000:>10.2f}ms  "
+            f"valid={result['valid']}")
+
+
+def compare(report, baseline, threshold=1.25):
+    """
+        Compare the total time of every (engine, category) against a baseline report.
+        Returns a list of (engine, category, baseline, current, ratio) for every regression above `threshold`.
+    """
+    previous = {(result['engine'], result['category']): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['engine'], result['category']))
+        if old is None or not old['total']:
+            continue
+        ratio = result['total'] / old['total']
+        if ratio > threshold:
+            regressions.append((result['engine'], result['category'], old['total'], result['total'], ratio))
+    return regressions
+
+
+def save(report, path):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
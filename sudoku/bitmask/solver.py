@@ -0,0 +1,262 @@
+from functools import lru_cache
+from itertools import islice
+
+from sudoku.base_solver import BaseSolver
+from sudoku.peers import SYMBOLS, layout
+from sudoku.sudoku_wrapper import Sudoku
+
+# Every candidate set is a bit mask, bit `d - 1` is set when digit `d` is still possible.
+# A 9x9 grid uses 9 bit masks, a 25x25 grid 25 bit masks.
+ALL_DIGITS = 0x1FF
+BIT_TO_DIGIT = {1 << (digit - 1): digit for digit in range(1, len(SYMBOLS) + 1)}
+
+
+@lru_cache(maxsize=None)
+def peer_tables(constraints, box=3):
+    """
+        Returns the peers that can't hold the same digit and the orthogonal neighbours that can't hold a
+        consecutive digit for every cell, built once for every set of constraint names and grid size.
+    """
+    tables = layout(box)
+    peers = [set(cell_peers) for cell_peers in tables.unit_peers]
+    for name in constraints - {'consecutive'}:
+        for cell, extra in enumerate(tables.constraint_peers[name]):
+            peers[cell].update(extra)
+    adjacent = tables.constraint_peers['consecutive'] if 'consecutive' in constraints else ((),) * tables.length
+    return tuple(map(tuple, peers)), adjacent
+
+
+class SudokuSolverBitmask(BaseSolver):
+    """
+        Solves Sudoku and variants of Sudoku using backtracking over candidate bitmasks.
+
+        Every cell holds a 9 bit candidate mask that is updated in place on every assignment and restored
+        from a trail on backtracking. Naked and hidden singles are propagated after every assignment and
+        the search always branches on the cell with the fewest candidates left.
+
+        :param flatline: str
+            A single line of 81 characters presenting the grid in row major order.
+        :param sudoku: 'Sudoku'
+            An already instantiated Sudoku representation.
+    """
+
+    def __init__(self, flatline=None, sudoku=None):
+        super().__init__(flatline, sudoku)
+        self.constraints = []
+        self.solved = None  # Final solved state of the sudoku if possible.
+        self.random = None  # Optional `random.Random`, to try the candidates of a cell in random order.
+
+        # Search state, (re)initialized on every run.
+        self.all_digits = ALL_DIGITS
+        self.units = ()
+        self.values = []
+        self.candidates = []
+        self.peers = ()
+        self.adjacent = ()
+        self.trail = []
+        self.assigned = []
+        self.queue = []
+
+    def add_knight_move_constraint(self):
+        """ Two cells that are a knight move away have to be different.  """
+        self.constraints.append('knight_move')
+
+    def add_kings_move_constraint(self):
+        """ All the adjacent cells (including diagonal) have to be different.  """
+        self.constraints.append('kings_move')
+
+    def add_non_consecutive_constraint(self):
+        """ Two orthogonal adjacent cells, have to differ by at least 2.  (6, 7 can't be neighbours)"""
+        self.constraints.append('consecutive')
+
+    def setup(self) -> bool:
+        """ Look up the peer tables for the active constraints and place the givens, False on a contradiction.  """
+        box, length = self.sudoku.box, len(self.sudoku.cells)
+        self.peers, self.adjacent = peer_tables(frozenset(self.constraints), box)
+        self.units, self.all_digits = layout(box).units, (1 << box * box) - 1
+
+        self.values = [0] * length
+        self.candidates = [self.all_digits] * length
+        self.trail, self.assigned, self.queue = [], [], []
+
+        for cell, value in enumerate(self.sudoku.cells):
+            if value:
+                if not (self.candidates[cell] >> (value - 1)) & 1 or not self.assign(cell, value):
+                    return False
+        return True
+
+    def assign(self, cell: int, digit: int) -> bool:
+        """ Place `digit` in `cell` and remove it from the candidates of all peers, False on a contradiction.  """
+        candidates, values, trail, queue = self.candidates, self.values, self.trail, self.queue
+        bit = 1 << (digit - 1)
+
+        trail.append((cell, candidates[cell]))
+        candidates[cell] = bit
+        values[cell] = digit
+        self.assigned.append(cell)
+
+        for peer in self.peers[cell]:
+            mask = candidates[peer]
+            if mask & bit:
+                if values[peer]:
+                    return False
+                trail.append((peer, mask))
+                mask ^= bit
+                candidates[peer] = mask
+                if not mask:
+                    return False
+                if not mask & (mask - 1):
+                    queue.append(peer)
+
+        # Non consecutive neighbours lose the digits directly above and below the placed digit.
+        banned = ((bit << 1) | (bit >> 1)) & self.all_digits
+        for peer in self.adjacent[cell]:
+            mask = candidates[peer]
+            if mask & banned:
+                if values[peer]:
+                    return False
+                trail.append((peer, mask))
+                mask &= ~banned
+                candidates[peer] = mask
+                if not mask:
+                    return False
+                if not mask & (mask - 1):
+                    queue.append(peer)
+        return True
+
+    def mark(self):
+        """ Returns a marker of the current search state, that can be restored using `undo`.  """
+        return len(self.trail), len(self.assigned)
+
+    def undo(self, mark):
+        """ Restore all candidates and values that changed since the `mark` was taken.  """
+        trail_size, assigned_size = mark
+        trail, assigned, candidates, values = self.trail, self.assigned, self.candidates, self.values
+        while len(trail) > trail_size:
+            cell, mask = trail.pop()
+            candidates[cell] = mask
+        while len(assigned) > assigned_size:
+            values[assigned.pop()] = 0
+        self.queue.clear()
+
+    def propagate(self) -> bool:
+        """ Apply naked and hidden singles until nothing changes, False on a contradiction.  """
+        candidates, values, queue, all_digits = self.candidates, self.values, self.queue, self.all_digits
+        while True:
+            while queue:
+                cell = queue.pop()
+                if not values[cell] and not self.assign(cell, BIT_TO_DIGIT[candidates[cell]]):
+                    return False
+
+            progress = False
+            for unit in self.units:
+                once = twice = placed = 0
+                for cell in unit:
+                    mask = candidates[cell]
+                    if values[cell]:
+                        placed |= mask
+                    else:
+                        twice |= once & mask
+                        once |= mask
+                if (once | placed) != all_digits:
+                    return False
+
+                hidden = once & ~twice & ~placed
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if candidates[cell] & bit and not values[cell]:
+                            if not self.assign(cell, BIT_TO_DIGIT[bit]):
+                                return False
+                            progress = True
+                            break
+            if not progress and not queue:
+                return True
+
+    def search(self):
+        """
+            Depth first search branching on the cell with the fewest candidates, yields True for every solution.
+            While the generator is suspended the cell values hold the solution.
+        """
+        self.spend()
+        stats = self.stats
+        if stats is None:
+            if not self.propagate():
+                return
+        else:
+            placed = len(self.assigned)
+            consistent = self.propagate()
+            stats.propagations += len(self.assigned) - placed
+            if not consistent:
+                return
+
+        candidates, values = self.candidates, self.values
+        best, best_count = None, len(SYMBOLS) + 1
+        for cell in range(len(values)):
+            if not values[cell]:
+                count = bin(candidates[cell]).count('1')  # int.bit_count needs Python 3.10.
+                if count < best_count:
+                    best, best_count = cell, count
+                    if count == 2:
+                        break
+        if best is None:
+            yield True
+            return
+
+        mask, digits = candidates[best], []
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            digits.append(BIT_TO_DIGIT[bit])
+        if self.random is not None:
+            self.random.shuffle(digits)
+
+        for digit in digits:
+            mark = self.mark()
+            if stats is not None:
+                stats.guesses += 1
+            if self.assign(best, digit):
+                yield from self.search()
+            self.undo(mark)
+            if stats is not None:
+                stats.backtracks += 1
+
+    def run(self, timeout=None, budget=None) -> Sudoku:
+        """ Run the actual solver, if successful it will return a new solved Sudoku instance, see `BaseSolver.run`.  """
+        with self.running(timeout, budget):
+            if not (self.setup() and next(self.search(), False)):
+                raise ValueError("Sudoku is not solvable\n")
+        self.solved = Sudoku.from_cells(self.values)
+        return self.solved
+
+    def solved_by_singles(self) -> bool:
+        """ Returns True if naked and hidden singles alone solve the sudoku, without any guessing.  """
+        return self.setup() and self.propagate() and all(self.values)
+
+    def iter_solutions(self):
+        """ Yields every solution as a new Sudoku instance.  """
+        if self.setup():
+            for _ in self.search():
+                yield Sudoku.from_cells(self.values)
+
+    def count_solutions(self, limit=None) -> int:
+        """ Count the solutions without creating Sudoku instances, stops at `limit` solutions.  """
+        if not self.setup():
+            return 0
+        return sum(1 for _ in islice(self.search(), limit))
+
+    def show(self, n=None):
+        """
+            Display the begin state and solved state of the Sudoku, side by side.
+
+            :param n: int
+                the grouping size (side of a sub square), by default the sub square size of the grid
+        """
+        n = n or self.sudoku.box
+        maketrans = str.maketrans({k: '.' for k in ' .xX'})
+        flatline_init = self.sudoku.flatline.translate(maketrans)
+        flatline_solved = self.solved.flatline.translate(maketrans) if self.solved is not None else flatline_init
+        valid_solution = self.solved.validate_solution() if self.solved is not None else 'FAILED'
+        print(f"\n\nBegin state and solved state of the Sudoku (valid={valid_solution})\n")
+        self.render(flatline_init, flatline_solved, n=n)
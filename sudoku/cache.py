@@ -0,0 +1,146 @@
+"""
+    Cache solutions by puzzle and constraint set, so resubmitted puzzles are not solved again.
+
+    The first tier is an in-memory LRU, the optional second tier an SQLite file that survives restarts and
+    can be shared by worker processes. A hit is answered before a session is looked up, so the Z3 and
+    pycosat models are never built for puzzles that are already known. Puzzles are keyed on their canonical
+    form, so a rotated or relabeled copy of a known puzzle is a hit as well, see `sudoku.symmetry`.
+
+    > cache = SolutionCache(path='solutions.db')
+    > solved = cache.solve(flatline, engine=SudokuSolverPycosat, constraints=['knight_move'])
+    > print(cache.counters())
+
+"""
+
+import sqlite3
+
+from collections import OrderedDict
+from functools import lru_cache
+
+from sudoku.bitmask.solver import SudokuSolverBitmask
+from sudoku.session import Session, get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+# Stored for puzzles without a solution, the empty string is never a valid flatline.
+UNSOLVABLE = ''
+
+
+class SolutionCache:
+    """
+        Solutions keyed on the puzzle and the set of extra constraints, unsolvable puzzles are cached as well.
+
+        :param maxsize: int
+            Number of puzzles in the in-memory tier, the least recently used puzzle is evicted first.
+        :param path: str
+            SQLite file for the persistent tier, None to only cache in memory.
+    """
+
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.memory = OrderedDict()  # Key -> canonical solution flatline, or UNSOLVABLE.
+        self.hits = self.disk_hits = self.misses = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT)")
+
+    @staticmethod
+    def key(sudoku, constraints=()):
+        """
+            Returns the cache key of a puzzle, the sorted constraint names followed by the canonical flatline, and
+            the transform to the canonical form. Equivalent puzzles share a key, see `sudoku.symmetry`.
+        """
+        from sudoku.symmetry import canonical
+
+        flatline, transform = canonical(sudoku, constraints)
+        return ','.join(sorted(set(constraints))) + ':' + flatline, transform
+
+    def get(self, sudoku, constraints=()):
+        """ Returns (True, solved Sudoku or None when not solvable) for a cached puzzle, (False, None) otherwise.  """
+        key, transform = self.key(sudoku, constraints)
+        found, solution = self.lookup(key)
+        return found, transform.restore(Sudoku(solution)) if solution else None
+
+    def put(self, sudoku, constraints, solved):
+        """ Store the solution of a puzzle, None when the puzzle is not solvable.  """
+        key, transform = self.key(sudoku, constraints)
+        self.store(key, transform.apply(solved).flatline if solved is not None else UNSOLVABLE)
+
+    def lookup(self, key):
+        """ Returns (True, canonical solution or UNSOLVABLE) for a cached key, (False, None) otherwise.  """
+        solution = self.memory.get(key)
+        if solution is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return True, solution
+
+        if self.connection is not None:
+            row = self.connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.remember(key, row[0])
+                self.disk_hits += 1
+                return True, row[0]
+
+        self.misses += 1
+        return False, None
+
+    def store(self, key, solution):
+        """ Add the canonical solution (or UNSOLVABLE) of a key to both tiers.  """
+        self.remember(key, solution)
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, solution))
+
+    def remember(self, key, solution):
+        """ Add to the in-memory tier, evicting the least recently used puzzle when it is full.  """
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def solve(self, puzzle, engine=SudokuSolverBitmask, constraints=(), timeout=None, budget=None) -> Sudoku:
+        """
+            Solve a single puzzle through the cache, raises a ValueError if the puzzle is not solvable.
+            Puzzles that hit the timeout or budget raise `BudgetExceeded` and are not cached, see `Session.solve`.
+        """
+        sudoku, constraints = Session.to_sudoku(puzzle), tuple(constraints)
+        key, transform = self.key(sudoku, constraints)
+        found, solution = self.lookup(key)
+        if found:
+            solved = transform.restore(Sudoku(solution)) if solution else None
+        else:
+            try:
+                solved = get_session(engine, constraints, sudoku.box).solve(sudoku, timeout=timeout, budget=budget)
+            except ValueError:
+                solved = None
+            self.store(key, transform.apply(solved).flatline if solved is not None else UNSOLVABLE)
+        if solved is None:
+            raise ValueError("Sudoku is not solvable\n")
+        return solved
+
+    def counters(self):
+        """ The hit and miss counters of this process.  """
+        return dict(hits=self.hits, disk_hits=self.disk_hits, misses=self.misses, size=len(self.memory))
+
+    def clear(self):
+        """ Remove every puzzle from both tiers and reset the counters.  """
+        self.memory.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("DELETE FROM solutions")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+@lru_cache(maxsize=8)
+def get_cache(path=None, maxsize=4096):
+    """ Returns a cache for the SQLite file (None for memory only), shared by all callers in this process.  """
+    return SolutionCache(maxsize, path)
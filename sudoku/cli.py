@@ -0,0 +1,275 @@
+"""
+    Command line interface for solving puzzle files.
+
+    > python -m sudoku solve --engine pycosat --constraints knight,king --input puzzles.txt --output solved.txt
+    > python -m sudoku unique --constraints knight --input puzzles.txt --output status.csv
+    > python -m sudoku generate --count 100 --constraints king --seed 42 --output puzzles.csv
+    > python -m sudoku serve --engine z3 --workers 4 --port 8080
+
+    Puzzles are read from `--input` (default stdin) and the solutions are written to `--output` (default stdout),
+    as one solution per line or as `puzzle,solution` CSV when the output name contains `.csv`. Puzzles that
+    can't be solved are written back unchanged, or with an empty solution column for CSV. The `unique` command
+    writes `puzzle,status` CSV, with status unique, multiple or none. The `generate` command writes new puzzles
+    with a single solution, the same seed always gives the same puzzles. The `serve` command answers JSON
+    requests over HTTP or stdin, see `sudoku.service`.
+
+"""
+
+import argparse
+import sys
+import time
+
+from collections import Counter
+from itertools import tee
+
+from sudoku.batch import solve_deduplicated, solve_many
+from sudoku.engines import ENGINES, constraint_names, get_engine
+from sudoku.puzzle_io import open_file, read_puzzles, to_line, write_puzzles, write_solutions
+from sudoku.sudoku_wrapper import Sudoku
+from sudoku.uniqueness import check_many
+
+
+def percentile(ordered, fraction):
+    """ Returns the value at `fraction` of an already sorted list, 0 for an empty list.  """
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else 0
+
+
+class Summary:
+    """ Collects the status and solve time of every puzzle while the results are streamed.  """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.latencies = []
+        self.counts = Counter()
+
+    def record(self, status, seconds):
+        self.latencies.append(seconds)
+        self.counts[status] += 1
+
+    def track(self, results, failed='not solvable'):
+        """ Record the (index, solved, seconds) results of `solve_many`, yields the solved Sudoku's.  """
+        for idx, solved, elapsed in results:
+            self.record('solved' if solved is not None else failed, elapsed)
+            yield solved
+
+    def report(self, file=sys.stderr):
+        total = time.perf_counter() - self.start
+        latencies = sorted(self.latencies)
+        counts = ', '.join(f"{count} {status}" for status, count in self.counts.items())
+        print(f"{len(latencies)} puzzles ({counts}) in {total:.2f}s "
+              f"({len(latencies) / total if total else 0:.1f} puzzles/sec), "
+              f"latency p50={percentile(latencies, 0.5) * 1000:.2f}ms p99={percentile(latencies, 0.99) * 1000:.2f}ms",
+              file=file)
+
+
+def solve(args):
+    engine = get_engine(args.engine)
+    constraints = args.constraints
+    puzzles, originals = tee(read_puzzles(args.input, raw=True))
+
+    summary = Summary()
+    if args.vectorized:
+        from sudoku.vectorized import solve_vectorized
+        results = solve_vectorized(puzzles, engine=engine, constraints=constraints, workers=args.workers,
+                                   chunksize=args.chunksize, with_timing=True, timeout=args.timeout,
+                                   budget=args.budget, cache=args.cache, dedupe=args.dedupe)
+    else:
+        solve_all = solve_deduplicated if args.dedupe else solve_many
+        results = solve_all(puzzles, engine=engine, constraints=constraints, workers=args.workers,
+                            chunksize=args.chunksize, with_timing=True, timeout=args.timeout, budget=args.budget,
+                            cache=args.cache)
+    limited = args.timeout is not None or args.budget is not None
+    pairs = zip(originals, summary.track(results, 'not solvable or unknown' if limited else 'not solvable'))
+
+    if '.csv' in args.output:
+        write_solutions(args.output, pairs)
+    else:
+        write_puzzles(args.output, (solved if solved is not None else puzzle for puzzle, solved in pairs))
+
+    if not args.quiet:
+        summary.report()
+
+
+def unique(args):
+    engine = get_engine(args.engine)
+    constraints = args.constraints
+    puzzles, originals = tee(read_puzzles(args.input, raw=True))
+
+    summary = Summary()
+    results = check_many(puzzles, engine=engine, constraints=constraints, workers=args.workers,
+                         chunksize=args.chunksize)
+    with open_file(args.output, 'wt' if args.output.endswith('.gz') else 'w') as file:
+        file.write("puzzle,status\n")
+        for puzzle, (idx, result) in zip(originals, results):
+            summary.record(result.status, result.seconds)
+            file.write(f"{to_line(puzzle)},{result.status}\n")
+
+    if not args.quiet:
+        summary.report()
+
+
+def generate(args):
+    from sudoku.generator import generate_many
+
+    start = time.perf_counter()
+    pairs = generate_many(args.count, constraints=args.constraints, seed=args.seed,
+                          clues=args.clues, difficulty=args.difficulty, workers=args.workers, box=args.box,
+                          engine=args.engine)
+    if '.csv' in args.output:
+        write_solutions(args.output, pairs)
+    else:
+        write_puzzles(args.output, (puzzle for puzzle, solution in pairs))
+
+    if not args.quiet:
+        print(f"{args.count} puzzles generated in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def serve(args):
+    import asyncio
+    from sudoku.service import AsyncSolverPool, serve_http, serve_lines
+
+    async def run():
+        async with AsyncSolverPool(args.engine, workers=args.workers, limit=args.limit,
+                                   max_waiting=args.max_waiting) as pool:
+            if args.stdin:
+                await serve_lines(pool)
+            else:
+                print(f"Serving on http://{args.host}:{args.port}/solve", file=sys.stderr)
+                await serve_http(pool, args.host, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def bench(args):
+    from sudoku import benchmark
+
+    if args.startup:
+        seconds, modules = benchmark.time_startup(repeat=args.repeat)
+        print(f"Startup with one easy solve: {seconds * 1000:.2f}ms (budget {args.startup_budget * 1000:.0f}ms)")
+        if modules:
+            print(f"[!] Heavy modules imported: {', '.join(modules)}", file=sys.stderr)
+        if seconds > args.startup_budget or modules:
+            sys.exit(1)
+        return
+
+    report = benchmark.run_benchmark(engines=args.engines, categories=args.categories, repeat=args.repeat,
+                                     generated=args.generated, include_slow=args.include_slow)
+    if args.save:
+        benchmark.save(report, args.save)
+
+    if args.baseline:
+        regressions = benchmark.compare(report, benchmark.load(args.baseline), threshold=args.threshold)
+        for engine, category, old, new, ratio in regressions:
+            print(f"[!] Regression {engine} {category}: {old * 1000:.2f}ms -> {new * 1000:.2f}ms ({ratio:.2f}x)",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+def names(value):
+    return [name for name in value.split(',') if name]
+
+
+def known_constraints(value):
+    """ Argument type of `--constraints`, the full names of the comma separated (short) constraint names.  """
+    full = constraint_names(names(value))
+    unknown = [name for name in full if name not in Sudoku.constraint_directions]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown constraints {', '.join(unknown)}, valid constraints: "
+                                         + ', '.join(Sudoku.constraint_directions))
+    return full
+
+
+def add_batch_arguments(parser):
+    parser.add_argument('--engine', choices=list(ENGINES), default='bitmask', help="solver engine (default: bitmask)")
+    parser.add_argument('--constraints', type=known_constraints, default=[],
+                        help="comma separated extra constraints: knight, king, consecutive")
+    parser.add_argument('--input', default='-', help="puzzle file, gzip'd if it ends with .gz (default: stdin)")
+    parser.add_argument('--output', default='-', help="result file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument('--chunksize', type=int, default=64, help="puzzles per worker task (default: 64)")
+    parser.add_argument('--quiet', action='store_true', help="don't print the timing summary")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m sudoku', description="Solve Sudoku puzzle files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    solver = commands.add_parser('solve', help="solve every puzzle of a puzzle file")
+    add_batch_arguments(solver)
+    solver.add_argument('--vectorized', action='store_true',
+                        help="propagate singles for all puzzles at once with NumPy, only search the remaining puzzles")
+    solver.add_argument('--timeout', type=float, default=None,
+                        help="maximum seconds per puzzle, unfinished puzzles are written back unchanged (default: none)")
+    solver.add_argument('--budget', type=int, default=None,
+                        help="maximum search work per puzzle: Z3 conflicts, pycosat propagations or search nodes")
+    solver.add_argument('--cache', default=None,
+                        help="SQLite file with the solutions of earlier runs, new solutions are added to it")
+    solver.add_argument('--dedupe', action='store_true',
+                        help="solve rotated, mirrored or relabeled copies of a puzzle only once")
+    solver.set_defaults(func=solve)
+
+    checker = commands.add_parser('unique', help="check that every puzzle of a puzzle file has a single solution")
+    add_batch_arguments(checker)
+    checker.set_defaults(func=unique)
+
+    generator = commands.add_parser('generate', help="generate puzzles with a single solution")
+    generator.add_argument('--count', type=int, default=1, help="number of puzzles (default: 1)")
+    generator.add_argument('--constraints', type=known_constraints, default=[],
+                           help="comma separated extra constraints: knight, king, consecutive")
+    generator.add_argument('--seed', default='0', help="seed, the same seed gives the same puzzles (default: 0)")
+    generator.add_argument('--clues', type=int, default=None, help="target number of clues (default: minimal)")
+    generator.add_argument('--difficulty', choices=['easy', 'hard'], default=None,
+                           help="easy puzzles are solved by singles alone, hard puzzles require guessing")
+    generator.add_argument('--engine', choices=list(ENGINES), default=None,
+                           help="engine for the uniqueness checks (default: the fastest for the constraints)")
+    generator.add_argument('--box', type=int, choices=[2, 3, 4, 5], default=3,
+                           help="sub square size, 3 for 9x9 and 4 for 16x16 puzzles (default: 3)")
+    generator.add_argument('--output', default='-', help="puzzle file, with solutions when it contains .csv")
+    generator.add_argument('--workers', type=int, default=None, help="number of worker processes (default: all CPUs)")
+    generator.add_argument('--quiet', action='store_true', help="don't print the timing summary")
+    generator.set_defaults(func=generate)
+
+    server = commands.add_parser('serve', help="solve JSON requests over HTTP or from stdin")
+    server.add_argument('--engine', choices=list(ENGINES), default='bitmask',
+                        help="engine for requests without an engine (default: bitmask)")
+    server.add_argument('--workers', type=int, default=None, help="number of worker processes (default: all CPUs)")
+    server.add_argument('--limit', type=int, default=None,
+                        help="puzzles in the worker pool at once (default: twice the workers)")
+    server.add_argument('--max-waiting', type=int, default=None,
+                        help="refuse requests once this many are waiting for the pool (default: no limit)")
+    server.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    server.add_argument('--port', type=int, default=8080, help="port to listen on (default: 8080)")
+    server.add_argument('--stdin', action='store_true', help="read JSON requests from stdin, one per line")
+    server.set_defaults(func=serve)
+
+    benchmark = commands.add_parser('bench', help="benchmark the engines on the example puzzles")
+    benchmark.add_argument('--engines', type=names, default=list(ENGINES), help="comma separated engine names")
+    benchmark.add_argument('--categories', type=names,
+                           default=['simple', 'hard', 'knight', 'kings', 'non_consecutive', 'miracle', 'sixteen',
+                                    'twenty_five'],
+                           help="comma separated example categories")
+    benchmark.add_argument('--repeat', type=int, default=3, help="runs per puzzle, the median is used (default: 3)")
+    benchmark.add_argument('--generated', type=int, default=0, help="number of generated normal puzzles to add")
+    benchmark.add_argument('--include-slow', action='store_true', help="also run combinations that take minutes")
+    benchmark.add_argument('--save', help="store the results as JSON")
+    benchmark.add_argument('--baseline', help="JSON results to compare against, exits with 1 on a regression")
+    benchmark.add_argument('--threshold', type=float, default=1.25, help="allowed slowdown ratio (default: 1.25)")
+    benchmark.add_argument('--startup', action='store_true',
+                           help="only time a fresh interpreter importing the package and solving one easy puzzle")
+    benchmark.add_argument('--startup-budget', type=float, default=0.25,
+                           help="maximum startup seconds, exits with 1 when exceeded (default: 0.25)")
+    benchmark.set_defaults(func=bench)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
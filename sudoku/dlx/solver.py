@@ -0,0 +1,270 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+
+from sudoku.base_solver import BaseSolver
+from sudoku.peers import layout
+from sudoku.sudoku_wrapper import Sudoku
+
+# The exact cover matrix as flat integer arrays, every node (root, column headers, row nodes) is an index.
+#   left, right, up, down   The circular links of every node.
+#   column                  The column header of every node.
+#   row                     The candidate of every node, `cell * size + value - 1` (-1 for the headers).
+#   count                   The number of nodes that are still linked in every column.
+#   first                   The first node of every candidate.
+Matrix = namedtuple('Matrix', ['left', 'right', 'up', 'down', 'column', 'row', 'count', 'first'])
+
+
+def conflicts(constraints, box=3):
+    """
+        Returns the pairs of candidates (cell * size + value - 1) that exclude each other by the extra constraints.
+        Pairs that are already excluded by a shared row, column or sub square are skipped.
+    """
+    tables = layout(box)
+    size, pairs = tables.size, set()
+    for name in sorted(constraints):
+        for cell, peer in tables.constraint_pairs[name]:
+            if name == 'consecutive':
+                for value in range(size - 1):
+                    pairs.add((cell * size + value, peer * size + value + 1))
+                    pairs.add((cell * size + value + 1, peer * size + value))
+            elif peer not in tables.unit_peers[cell]:
+                pairs.update((cell * size + value, peer * size + value) for value in range(size))
+    return sorted(pairs)
+
+
+@lru_cache(maxsize=None)
+def exact_cover(constraints, box=3) -> Matrix:
+    """
+        Build the exact cover matrix of an empty grid, once for every set of constraint names and grid size.
+
+        Every candidate (a value in a cell) is a row that covers four primary columns: its cell, and the value
+        in its row, column and sub square. Every pair of candidates that exclude each other by the extra
+        constraints gets a secondary column, which can be covered at most once but doesn't have to be covered.
+    """
+    tables = layout(box)
+    size, length = tables.size, tables.length
+    pairs = conflicts(constraints, box)
+    primary = 4 * length
+    headers = 1 + primary + len(pairs)
+
+    # The root (0) and the primary columns form a circular list, secondary columns only link to themselves.
+    left = [primary] + list(range(primary)) + list(range(primary + 1, headers))
+    right = list(range(1, primary + 1)) + [0] + list(range(primary + 1, headers))
+    up, down, column = list(range(headers)), list(range(headers)), list(range(headers))
+    row, count = [-1] * headers, [0] * headers
+
+    secondary = [[] for _ in range(length * size)]
+    for idx, (a, b) in enumerate(pairs, start=primary + 1):
+        secondary[a].append(idx)
+        secondary[b].append(idx)
+
+    first = []
+    for candidate in range(length * size):
+        cell, value = divmod(candidate, size)
+        r, c = divmod(cell, size)
+        b = (r // box) * box + c // box
+        columns = [1 + cell, 1 + length + r * size + value, 1 + 2 * length + c * size + value,
+                   1 + 3 * length + b * size + value] + secondary[candidate]
+
+        start = len(column)
+        first.append(start)
+        for offset, header in enumerate(columns):
+            node = start + offset
+            left.append(start + (offset - 1) % len(columns))
+            right.append(start + (offset + 1) % len(columns))
+            up.append(up[header])
+            down.append(header)
+            down[up[header]] = node
+            up[header] = node
+            column.append(header)
+            row.append(candidate)
+            count[header] += 1
+    return Matrix(left, right, up, down, column, row, count, first)
+
+
+class SudokuSolverDLX(BaseSolver):
+    """
+        Solves Sudoku and variants of Sudoku as an exact cover problem, with Knuth's Algorithm X.
+
+        The dancing links are stored in flat integer arrays instead of linked node objects, copying the
+        cached matrix of the empty grid is all that is needed to start a new puzzle. The search always
+        branches on the column with the fewest rows left. The extra constraints are secondary columns,
+        covering one removes every candidate that conflicts with the chosen candidate.
+
+        :param flatline: str
+            A single line of 81 characters presenting the grid in row major order.
+        :param sudoku: 'Sudoku'
+            An already instantiated Sudoku representation.
+    """
+
+    def __init__(self, flatline=None, sudoku=None):
+        super().__init__(flatline, sudoku)
+        self.constraints = []
+        self.solved = None  # Final solved state of the sudoku if possible.
+
+        # Search state, (re)initialized on every run.
+        self.left, self.right, self.up, self.down, self.count = [], [], [], [], []
+        self.column, self.row = (), ()
+        self.chosen = []
+
+    def add_knight_move_constraint(self):
+        """ Two cells that are a knight move away have to be different.  """
+        self.constraints.append('knight_move')
+
+    def add_kings_move_constraint(self):
+        """ All the adjacent cells (including diagonal) have to be different.  """
+        self.constraints.append('kings_move')
+
+    def add_non_consecutive_constraint(self):
+        """ Two orthogonal adjacent cells, have to differ by at least 2.  (6, 7 can't be neighbours)"""
+        self.constraints.append('consecutive')
+
+    def setup(self) -> bool:
+        """ Copy the matrix for the active constraints and select the givens, False on a contradiction.  """
+        matrix = exact_cover(frozenset(self.constraints), self.sudoku.box)
+        self.left, self.right, self.up, self.down, self.count = (
+            matrix.left[:], matrix.right[:], matrix.up[:], matrix.down[:], matrix.count[:])
+        self.column, self.row = matrix.column, matrix.row
+        self.chosen = []
+
+        size = self.sudoku.size
+        for cell, value in enumerate(self.sudoku.cells):
+            if value and not self.select(matrix.first[cell * size + value - 1]):
+                return False
+        return True
+
+    def select(self, node) -> bool:
+        """ Choose the row of `node` as part of the solution, False if it was already removed by another row.  """
+        up, down, right = self.up, self.down, self.right
+        if down[up[node]] != node:
+            return False
+        j = right[node]
+        while j != node:
+            if down[up[j]] != j:
+                return False
+            j = right[j]
+
+        self.cover(self.column[node])
+        j = right[node]
+        while j != node:
+            self.cover(self.column[j])
+            j = right[j]
+        return True
+
+    def cover(self, c):
+        """ Remove column `c` from the header list and all rows in column `c` from the other columns.  """
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        left[right[c]], right[left[c]] = left[c], right[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                up[down[j]], down[up[j]] = up[j], down[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        """ Restore column `c` and its rows, in exactly the reverse order of `cover`.  """
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                up[down[j]] = down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        left[right[c]] = right[left[c]] = c
+
+    def search(self):
+        """
+            Algorithm X branching on the primary column with the fewest rows, yields True for every solution.
+            While the generator is suspended the chosen rows hold the solution.
+        """
+        self.spend()
+        right, left, down, count, column = self.right, self.left, self.down, self.count, self.column
+        c = right[0]
+        if c == 0:
+            yield True
+            return
+
+        j, best = right[c], count[c]
+        while j and best > 1:
+            if count[j] < best:
+                c, best = j, count[j]
+            j = right[j]
+        if not best:
+            return
+
+        # A column with a single row left is a forced choice, only columns with more rows are guesses.
+        stats, forced = self.stats, best == 1
+        self.cover(c)
+        r = down[c]
+        while r != c:
+            if stats is not None:
+                if forced:
+                    stats.propagations += 1
+                else:
+                    stats.guesses += 1
+            self.chosen.append(self.row[r])
+            j = right[r]
+            while j != r:
+                self.cover(column[j])
+                j = right[j]
+
+            yield from self.search()
+
+            j = left[r]
+            while j != r:
+                self.uncover(column[j])
+                j = left[j]
+            self.chosen.pop()
+            if stats is not None and not forced:
+                stats.backtracks += 1
+            r = down[r]
+        self.uncover(c)
+
+    def solution(self) -> Sudoku:
+        """ The givens together with the chosen rows, as a new Sudoku instance.  """
+        cells, size = bytearray(self.sudoku.cells), self.sudoku.size
+        for candidate in self.chosen:
+            cell, value = divmod(candidate, size)
+            cells[cell] = value + 1
+        return Sudoku.from_cells(cells)
+
+    def run(self, timeout=None, budget=None) -> Sudoku:
+        """ Run the actual solver, if successful it will return a new solved Sudoku instance, see `BaseSolver.run`.  """
+        with self.running(timeout, budget):
+            if not (self.setup() and next(self.search(), False)):
+                raise ValueError("Sudoku is not solvable\n")
+        self.solved = self.solution()
+        return self.solved
+
+    def iter_solutions(self):
+        """ Yields every solution as a new Sudoku instance.  """
+        if self.setup():
+            for _ in self.search():
+                yield self.solution()
+
+    def count_solutions(self, limit=None) -> int:
+        """ Count the solutions without creating Sudoku instances, stops at `limit` solutions.  """
+        if not self.setup():
+            return 0
+        return sum(1 for _ in islice(self.search(), limit))
+
+    def show(self, n=None):
+        """
+            Display the begin state and solved state of the Sudoku, side by side.
+
+            :param n: int
+                the grouping size (side of a sub square), by default the sub square size of the grid
+        """
+        n = n or self.sudoku.box
+        maketrans = str.maketrans({k: '.' for k in ' .xX'})
+        flatline_init = self.sudoku.flatline.translate(maketrans)
+        flatline_solved = self.solved.flatline.translate(maketrans) if self.solved is not None else flatline_init
+        valid_solution = self.solved.validate_solution() if self.solved is not None else 'FAILED'
+        print(f"\n\nBegin state and solved state of the Sudoku (valid={valid_solution})\n")
+        self.render(flatline_init, flatline_solved, n=n)
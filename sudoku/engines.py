@@ -0,0 +1,39 @@
+"""
+    Registry of all solver engines by name.
+
+    Engines are only imported when requested, so z3 and pycosat are not loaded unless they are used.
+
+"""
+
+from importlib import import_module
+
+ENGINES = dict(
+        bitmask='sudoku.bitmask.solver:SudokuSolverBitmask',
+        dlx='sudoku.dlx.solver:SudokuSolverDLX',
+        backtracking='sudoku.backtracking.solver:Backtracking',
+        pycosat='sudoku.pycosatpy.solver:SudokuSolverPycosat',
+        z3='sudoku.z3py.solver:SudokuSolverZ3',
+        z3_bitvec='sudoku.z3py.solver:SudokuSolverZ3BitVec',
+        z3_onehot='sudoku.z3py.solver:SudokuSolverZ3OneHot',
+)
+
+# Short names for the extra constraints, as accepted on the command line.
+CONSTRAINT_ALIASES = dict(
+        knight='knight_move',
+        king='kings_move',
+        kings='kings_move',
+        non_consecutive='consecutive',
+)
+
+
+def get_engine(name):
+    """ Returns the solver class registered as `name`.  """
+    if name not in ENGINES:
+        raise KeyError(f"`{name}`, valid engines: " + str(list(ENGINES)))
+    module, cls = ENGINES[name].split(':')
+    return getattr(import_module(module), cls)
+
+
+def constraint_names(names):
+    """ Convert (short) constraint names to their `Sudoku.constraint_directions` name.  """
+    return [CONSTRAINT_ALIASES.get(name, name) for name in names]
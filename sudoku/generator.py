@@ -0,0 +1,145 @@
+"""
+    Generate new puzzles for any combination of the extra constraints.
+
+    A random full grid is created by solving an empty grid with a randomized search. Afterwards the clues
+    are removed one by one in random order, a removal is only kept when the puzzle still has a single
+    solution. Every puzzle is generated from its own seed, so the output only depends on the seed and
+    not on the number of workers.
+
+    > for puzzle, solution in generate_many(10, constraints=['knight_move'], seed=42):
+    >     print(puzzle.flatline)
+
+"""
+
+import random
+
+from sudoku.batch import map_chunks
+from sudoku.bitmask.solver import SudokuSolverBitmask
+from sudoku.engines import get_engine
+from sudoku.peers import BOX_BY_LENGTH
+from sudoku.session import get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+DIFFICULTIES = ('easy', 'hard')
+
+
+def uniqueness_engine(constraints=()) -> str:
+    """
+        The name of the fastest engine for the uniqueness checks of a constraint set. The bitmask search is the
+        fastest for normal and kings move puzzles, but counting the solutions of sparse knight move and non
+        consecutive puzzles is up to 8x faster with pycosat.
+    """
+    return 'pycosat' if {'knight_move', 'consecutive'} & set(constraints) else 'bitmask'
+
+
+def full_grid(constraints=(), rng=None, box=3) -> Sudoku:
+    """ Returns a random completely filled grid with sub squares of `box` x `box` that satisfies all constraints.  """
+    solver = SudokuSolverBitmask(sudoku=Sudoku.from_cells(bytes(box ** 4)))
+    solver.random = rng or random.Random()
+    for name in constraints:
+        solver.add_constraint(name)
+    return solver.run()
+
+
+def is_unique(cells, constraints=(), engine=None) -> bool:
+    """ The puzzle has exactly one solution, counted by the engine with this name (see `uniqueness_engine`).  """
+    engine = get_engine(engine or uniqueness_engine(constraints))
+    session = get_session(engine, tuple(constraints), BOX_BY_LENGTH[len(cells)])
+    return session.count_solutions(bytes(cells), limit=2) == 1
+
+
+def is_easy(cells, constraints=()) -> bool:
+    """ The puzzle is solved by naked and hidden singles alone, no guessing is required.  """
+    solver = SudokuSolverBitmask(sudoku=Sudoku.from_cells(cells))
+    for name in constraints:
+        solver.add_constraint(name)
+    return solver.solved_by_singles()
+
+
+def reduce(solution, constraints=(), rng=None, clues=None, easy=False, engine=None) -> Sudoku:
+    """
+        Remove clues from a solved grid in random order, while the puzzle keeps a single solution.
+
+        :param solution: Sudoku
+            A completely filled grid.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param rng: random.Random
+            Source of randomness for the removal order.
+        :param clues: int
+            Stop removing at this number of clues, None to remove until the puzzle is minimal.
+        :param easy: bool
+            Only keep removals after which the puzzle is still solved by singles alone.
+        :param engine: str
+            Name of the engine for the uniqueness checks, None for the fastest for the constraints.
+    """
+    rng = rng or random.Random()
+    cells = bytearray(solution.cells)
+    order = list(range(len(cells)))
+    rng.shuffle(order)
+
+    remaining = len(cells)
+    for cell in order:
+        if clues is not None and remaining <= clues:
+            break
+        value, cells[cell] = cells[cell], 0
+        if is_unique(cells, constraints, engine) and (not easy or is_easy(cells, constraints)):
+            remaining -= 1
+        else:
+            cells[cell] = value
+    return Sudoku.from_cells(cells)
+
+
+def generate(constraints=(), seed=None, clues=None, difficulty=None, attempts=20, box=3, engine=None):
+    """
+        Generate a single puzzle with a single solution, returns the (puzzle, solution) pair.
+
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param seed: Hashable
+            Seed for the random generator, the same seed always results in the same puzzle.
+        :param clues: int
+            Target number of clues, None for a minimal puzzle (no clue can be removed).
+        :param difficulty: str
+            `easy` puzzles are solved by singles alone, `hard` puzzles require guessing, None for either.
+        :param attempts: int
+            Number of grids that are tried to reach the difficulty.
+        :param box: int
+            The sub square size, 3 for a 9x9 puzzle and 4 for a 16x16 puzzle.
+        :param engine: str
+            Name of the engine for the uniqueness checks, None for the fastest for the constraints, see
+            `uniqueness_engine`. The puzzles don't depend on the engine.
+    """
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise ValueError(f"`{difficulty}`, valid difficulties: {DIFFICULTIES}")
+    rng = random.Random(seed)
+    constraints = tuple(constraints)
+
+    for _ in range(attempts):
+        solution = full_grid(constraints, rng, box)
+        puzzle = reduce(solution, constraints, rng, clues, easy=difficulty == 'easy', engine=engine)
+        if difficulty != 'hard' or not is_easy(puzzle.cells, constraints):
+            return puzzle, solution
+    raise ValueError(f"No {difficulty} puzzle found in {attempts} attempts")
+
+
+def generate_chunk(seeds, constraints=(), clues=None, difficulty=None, box=3, engine=None):
+    """ Worker task, returns the raw (puzzle, solution) cells for every seed.  """
+    results = []
+    for seed in seeds:
+        puzzle, solution = generate(constraints, seed, clues, difficulty, box=box, engine=engine)
+        results.append((bytes(puzzle.cells), bytes(solution.cells)))
+    return results
+
+
+def generate_many(count, constraints=(), seed=0, clues=None, difficulty=None, workers=None, chunksize=8, box=3,
+                  engine=None):
+    """
+        Generate `count` puzzles in a process pool, yields (puzzle, solution) pairs.
+        Puzzle `i` is generated from the seed "{seed}-{i}", see `generate` for the other parameters.
+    """
+    seeds = (f"{seed}-{idx}" for idx in range(count))
+    args = (tuple(constraints), clues, difficulty, box, engine)
+    for start, results in map_chunks(generate_chunk, seeds, args, workers, chunksize):
+        for puzzle, solution in results:
+            yield Sudoku.from_cells(puzzle), Sudoku.from_cells(solution)
@@ -1,9 +1,13 @@
-from sudoku.z3py import main as z3py
-from sudoku.pycosatpy import main as pycosatpy
-from sudoku.backtracking import main as backtracking
+"""
+    Solve the examples with every engine. The engine modules are imported by the function that uses them,
+    so z3, pycosat and tqdm are only loaded for the engines that are run.
+
+"""
 
 
 def backtracking_solve_all(flatline=None, sudoku=None):
+    from sudoku.backtracking import main as backtracking
+
     backtracking.solve_normal(flatline, sudoku)
     backtracking.solve_knight_move_constraint(flatline, sudoku)
     backtracking.solve_kings_move_constraint(flatline, sudoku)
@@ -13,7 +17,29 @@ def backtracking_solve_all(flatline=None, sudoku=None):
     # backtracking.solve_miracle(flatline, sudoku)
 
 
+def bitmask_solve_all(flatline=None, sudoku=None):
+    from sudoku.bitmask import main as bitmask
+
+    bitmask.solve_normal(flatline, sudoku)
+    bitmask.solve_knight_move_constraint(flatline, sudoku)
+    bitmask.solve_kings_move_constraint(flatline, sudoku)
+    bitmask.solve_non_consecutive_constraint(flatline, sudoku)
+    bitmask.solve_miracle(flatline, sudoku)
+
+
+def dlx_solve_all(flatline=None, sudoku=None):
+    from sudoku.dlx import main as dlx
+
+    dlx.solve_normal(flatline, sudoku)
+    dlx.solve_knight_move_constraint(flatline, sudoku)
+    dlx.solve_kings_move_constraint(flatline, sudoku)
+    dlx.solve_non_consecutive_constraint(flatline, sudoku)
+    dlx.solve_miracle(flatline, sudoku)
+
+
 def z3_solve_all(flatline=None, sudoku=None):
+    from sudoku.z3py import main as z3py
+
     z3py.solve_normal(flatline, sudoku)
     z3py.solve_knight_move_constraint(flatline, sudoku)
     z3py.solve_kings_move_constraint(flatline, sudoku)
@@ -22,10 +48,18 @@ def z3_solve_all(flatline=None, sudoku=None):
 
 
 def pycosat_solve_all(flatline=None, sudoku=None):
+    from sudoku.pycosatpy import main as pycosatpy
+
     pycosatpy.solve_normal(flatline, sudoku)
+    pycosatpy.solve_knight_move_constraint(flatline, sudoku)
+    pycosatpy.solve_kings_move_constraint(flatline, sudoku)
+    pycosatpy.solve_non_consecutive_constraint(flatline, sudoku)
+    pycosatpy.solve_miracle(flatline, sudoku)
 
 
 if __name__ == '__main__':
     z3_solve_all()
     pycosat_solve_all()
     backtracking_solve_all()
+    bitmask_solve_all()
+    dlx_solve_all()
@@ -0,0 +1,140 @@
+"""
+    Precomputed cell index tables, shared by the Sudoku representation and all solvers.
+
+    Cells are numbered in row major order, for the default 9x9 grid `A1` is 0, `A9` is 8 and `I9` is 80.
+    Grids of other sizes are described by their sub square size (the box), a box of 4 is a 16x16 grid.
+    All tables of a grid size are computed once, hot loops can index them with integer cells
+    instead of recomputing neighbours from "A1" strings.
+
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+from string import ascii_uppercase
+
+# The symbol of every value in a flatline, digits first and letters for the values above 9.
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+
+# Supported sub square sizes, from 4x4 up to 25x25 grids, by the number of cells in the grid.
+BOX_BY_LENGTH = {box ** 4: box for box in range(2, 6)}
+
+# Direction for different constraints that occur in `Cracking the Cryptic`
+CONSTRAINT_DIRECTIONS = dict(
+        consecutive=((-1, 0), (1, 0), (0, -1), (0, 1)),
+        kings_move=((1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1)),
+        knight_move=((1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1))
+)
+
+Layout = namedtuple('Layout', ['box', 'size', 'length', 'rows', 'columns', 'positions', 'cells', 'units',
+                               'unit_peers', 'constraint_peers', 'constraint_pairs'])
+Layout.__doc__ = """ All index tables of a grid with sub squares of `box` x `box` and `size` = box² values.  """
+
+
+def neighbours(cell, directions, size=9):
+    """
+        Returns the cell indices that are reachable from `cell` with a single step in one of the directions.
+
+        > neighbours(0, ((-1, 0), (1, 0), (0, -1), (0, 1)))
+        (9, 1)
+    """
+    row, column = divmod(cell, size)
+    return tuple((row + d_row) * size + column + d_column for d_row, d_column in directions
+                 if 0 <= row + d_row < size and 0 <= column + d_column < size)
+
+
+@lru_cache(maxsize=None)
+def layout(box=3) -> Layout:
+    """ Returns the tables of the grid with sub squares of `box` x `box`, built once for every size.  """
+    if box not in BOX_BY_LENGTH.values():
+        raise ValueError(f"Unsupported sub square size {box}, valid sizes: {list(BOX_BY_LENGTH.values())}")
+    size = box * box
+    rows, columns = ascii_uppercase[:size], tuple(str(column) for column in range(1, size + 1))
+
+    # Cell index to position name, A1, A2, A3 etc ...
+    positions = tuple(map(''.join, product(rows, columns)))
+
+    # Cell indices of every row, column and sub square.
+    units = tuple(
+            [tuple(row * size + col for col in range(size)) for row in range(size)]
+            + [tuple(row * size + col for row in range(size)) for col in range(size)]
+            + [tuple((box_row + row) * size + box_col + col for row, col in product(range(box), repeat=2))
+               for box_row, box_col in product(range(0, size, box), repeat=2)]
+    )
+
+    # For every cell all other cells that share a row, column or sub square.
+    unit_peers = [set() for _ in range(size * size)]
+    for unit in units:
+        for cell in unit:
+            unit_peers[cell].update(unit)
+
+    # For every constraint name and every cell, the cells affected by that constraint.
+    peers = {
+        name: tuple(neighbours(cell, directions, size) for cell in range(size * size))
+        for name, directions in CONSTRAINT_DIRECTIONS.items()
+    }
+
+    # Every affected pair of cells only once (lowest cell first), all constraints are symmetric.
+    pairs = {
+        name: tuple((cell, peer) for cell, cell_peers in enumerate(table) for peer in cell_peers if cell < peer)
+        for name, table in peers.items()
+    }
+    return Layout(box, size, size * size, rows, columns, positions,
+                  {pos: cell for cell, pos in enumerate(positions)}, units,
+                  tuple(tuple(sorted(cell_peers - {cell})) for cell, cell_peers in enumerate(unit_peers)),
+                  peers, pairs)
+
+
+# The tables of the default 9x9 grid.
+LAYOUT = layout(3)
+ROWS, COLUMNS, POSITIONS, CELLS = LAYOUT.rows, LAYOUT.columns, LAYOUT.positions, LAYOUT.cells
+UNITS, UNIT_PEERS = LAYOUT.units, LAYOUT.unit_peers
+CONSTRAINT_PEERS, CONSTRAINT_PAIRS = LAYOUT.constraint_peers, LAYOUT.constraint_pairs
+
+
+def constraint_peers(name, box=3):
+    """ Returns for every cell index the cell indices affected by the `name` constraint.  """
+    table = layout(box).constraint_peers
+    if name not in table:
+        raise KeyError(f"`{name}`, valid keys: " + str(list(table)))
+    return table[name]
+
+
+def constraint_pairs(name, box=3):
+    """ Returns every pair of cell indices affected by the `name` constraint, each pair only once.  """
+    table = layout(box).constraint_pairs
+    if name not in table:
+        raise KeyError(f"`{name}`, valid keys: " + str(list(table)))
+    return table[name]
+
+
+def consistent(puzzle, constraints=()):
+    """ Verify that no two givens of the puzzle clash in a unit or one of the extra constraints.  """
+    cells, table = puzzle.cells, layout(puzzle.box)
+    for cell, value in enumerate(cells):
+        if not value:
+            continue
+        if any(cells[peer] == value for peer in table.unit_peers[cell]):
+            return False
+        for name in constraints:
+            for peer in constraint_peers(name, puzzle.box)[cell]:
+                if cells[peer] and (abs(cells[peer] - value) == 1 if name == 'consecutive' else cells[peer] == value):
+                    return False
+    return True
+
+
+def valid(puzzle, solved, constraints):
+    """ Verify that the solved Sudoku matches the givens of the puzzle, every unit and the extra constraints.  """
+    if solved is None or not solved.validate_solution():
+        return False
+    cells = solved.cells
+    if any(given and given != value for given, value in zip(puzzle.cells, cells)):
+        return False
+    for name in constraints:
+        for cell, peers in enumerate(constraint_peers(name, solved.box)):
+            if name == 'consecutive':
+                if any(abs(cells[cell] - cells[peer]) == 1 for peer in peers):
+                    return False
+            elif any(cells[cell] == cells[peer] for peer in peers):
+                return False
+    return True
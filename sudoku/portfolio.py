@@ -0,0 +1,217 @@
+"""
+    Race several engines on the same puzzle and keep the first answer.
+
+    Every engine runs in its own worker process that keeps its models between puzzles, see `Session`. A puzzle is
+    sent to all workers at once, the first valid answer wins and the workers that are still busy are terminated
+    and restarted. The winners are counted per constraint set, so later puzzles can be raced by the engines
+    that won most often only.
+
+    > with Portfolio(engines=('z3', 'pycosat', 'backtracking'), top=1, warmup=5) as portfolio:
+    >     for flatline in KNIGHT_CONSTRAINT:
+    >         solved, engine, seconds = portfolio.solve(flatline, constraints=['knight_move'])
+    >     print(portfolio.ranking(['knight_move']))
+
+"""
+
+import json
+import multiprocessing
+import time
+
+from collections import Counter, defaultdict
+from multiprocessing.connection import wait
+
+from sudoku.engines import get_engine
+from sudoku.peers import consistent, valid
+from sudoku.session import Session, get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+DEFAULT_ENGINES = ('z3', 'pycosat', 'backtracking')
+
+# Engines that prove a puzzle not solvable by a complete search, their answer ends the race.
+COMPLETE_ENGINES = ('bitmask', 'dlx', 'pycosat', 'z3', 'z3_bitvec', 'z3_onehot')
+
+
+def worker(name, connection):
+    """
+        Worker process loop, solves every (cells, constraints) request with the `name` engine.
+        Replies (cells or None, seconds), or (False, error message) if the engine failed.
+    """
+    engine = get_engine(name)
+    while True:
+        try:
+            cells, constraints = connection.recv()
+        except EOFError:
+            return
+        start = time.perf_counter()
+        try:
+            sudoku = Sudoku.from_cells(cells)
+            solved = get_session(engine, constraints, sudoku.box).solve(sudoku)
+            connection.send((bytes(solved.cells), time.perf_counter() - start))
+        except ValueError:
+            connection.send((None, time.perf_counter() - start))
+        except Exception as error:
+            connection.send((False, f"{type(error).__name__}: {error}"))
+
+
+def key(constraints) -> str:
+    """ The history key of a set of constraint names, independent of order, `''` without extra constraints.  """
+    return ','.join(sorted(set(constraints)))
+
+
+class Portfolio:
+    """
+        Solve puzzles by racing engines in parallel processes, records which engine wins for every constraint set.
+
+        :param engines: Iterable[str]
+            Names of the engines that race, see `sudoku.engines.ENGINES`.
+        :param top: int
+            Once a constraint set has `warmup` recorded races, only the `top` engines with the most wins race.
+            By default all engines always race.
+        :param warmup: int
+            Number of races with all engines before the history is used.
+    """
+
+    def __init__(self, engines=DEFAULT_ENGINES, top=None, warmup=10):
+        self.engines = tuple(engines)
+        for name in self.engines:
+            get_engine(name)  # Fail early on unknown names, workers would only fail once they are started.
+        self.top = top
+        self.warmup = warmup
+        self.wins = defaultdict(Counter)  # Constraint set key -> engine name -> number of races won.
+        self.seconds = defaultdict(Counter)  # Constraint set key -> engine name -> total solve time of the wins.
+        self.workers = {}  # Engine name -> (process, connection), started on first use.
+
+    def start(self, name):
+        """ Returns the connection to the worker of engine `name`, starting the process if needed.  """
+        if name not in self.workers:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker, args=(name, child), daemon=True)
+            process.start()
+            child.close()
+            self.workers[name] = (process, parent)
+        return self.workers[name][1]
+
+    def stop(self, name):
+        """ Terminate the worker of engine `name`, the next race starts a new one.  """
+        process, connection = self.workers.pop(name)
+        process.terminate()
+        process.join()
+        connection.close()
+
+    def close(self):
+        """ Terminate all worker processes.  """
+        for name in list(self.workers):
+            self.stop(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ranking(self, constraints=()):
+        """ Returns the engine names ordered by the number of races won for the constraint set, then the mean time.  """
+        wins, seconds = self.wins[key(constraints)], self.seconds[key(constraints)]
+        return sorted(self.engines, key=lambda name: (-wins[name], seconds[name] / wins[name] if wins[name] else 0))
+
+    def best_engine(self, constraints=()):
+        """ Returns the name of the engine that won most often for the constraint set.  """
+        return self.ranking(constraints)[0]
+
+    def contenders(self, constraints=()):
+        """ Returns the engine names that race for the constraint set, see `top` and `warmup`.  """
+        if self.top is None or sum(self.wins[key(constraints)].values()) < self.warmup:
+            return self.engines
+        return tuple(self.ranking(constraints)[:self.top])
+
+    def solve(self, puzzle, constraints=(), timeout=None):
+        """
+            Race the engines on a single puzzle, returns (solved Sudoku or None, engine name, seconds).
+            The solved Sudoku is None when the puzzle is not solvable, raises a RuntimeError if every engine failed.
+            The engine name is None when the givens clash and no engine raced.
+
+            A solution is only accepted if it satisfies the givens and all constraints, an engine that
+            doesn't support a constraint can't win with a wrong answer. Givens that already clash are reported
+            not solvable without a race, otherwise the first not solvable answer of one of the `COMPLETE_ENGINES`
+            ends the race. The answer of any other engine only counts once no engine is left racing.
+
+            :param puzzle: Union[str, bytes, Sudoku]
+                A flatline, raw cells (see `Sudoku.from_cells`) or an already instantiated Sudoku.
+            :param constraints: Iterable[str]
+                Names of extra constraints, see `Sudoku.constraint_directions`.
+            :param timeout: float
+                Maximum number of seconds for the race, None for no limit. The engines that are still busy at
+                the deadline are restarted. The puzzle is reported not solvable if an engine found that in time,
+                otherwise a TimeoutError is raised.
+        """
+        sudoku, constraints = Session.to_sudoku(puzzle), tuple(constraints)
+        if not consistent(sudoku, constraints):
+            return None, None, 0.0
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        racing = {}
+        for name in self.contenders(constraints):
+            connection = self.start(name)
+            connection.send((bytes(sudoku.cells), constraints))
+            racing[connection] = name
+
+        errors, unsolvable = {}, None
+        while racing:
+            ready = wait(list(racing), None if deadline is None else max(deadline - time.perf_counter(), 0))
+            if not ready:
+                for name in racing.values():
+                    self.stop(name)
+                if unsolvable is None:
+                    raise TimeoutError(f"No engine solved the puzzle within {timeout} seconds")
+                break
+
+            for connection in ready:
+                name = racing.pop(connection)
+                try:
+                    cells, seconds = connection.recv()
+                except EOFError:
+                    errors[name] = "worker process died"
+                    self.stop(name)
+                    continue
+
+                if cells is False:
+                    errors[name] = seconds
+                    continue
+                if cells is None:
+                    unsolvable = unsolvable or (name, seconds)
+                    if name not in COMPLETE_ENGINES:
+                        continue
+                    solved = None
+                else:
+                    solved = Sudoku.from_cells(cells)
+                    if not valid(sudoku, solved, constraints):
+                        errors[name] = "invalid solution"
+                        continue
+
+                # The losers are still busy with this puzzle, a restart is the only way to cancel them.
+                for loser in racing.values():
+                    self.stop(loser)
+                return self.record(constraints, solved, name, seconds)
+
+        if unsolvable is not None:
+            return self.record(constraints, None, *unsolvable)
+        raise RuntimeError("All engines failed: " + ', '.join(f"{name} ({error})" for name, error in errors.items()))
+
+    def record(self, constraints, solved, name, seconds):
+        """ Count the win of engine `name` for the constraint set, returns the race result.  """
+        self.wins[key(constraints)][name] += 1
+        self.seconds[key(constraints)][name] += seconds
+        return solved, name, seconds
+
+    def save(self, path):
+        """ Store the win history as JSON, see `load`.  """
+        with open(path, 'w') as file:
+            json.dump(dict(wins=self.wins, seconds=self.seconds), file, indent=2)
+
+    def load(self, path):
+        """ Add the win history of an earlier `save`.  """
+        with open(path) as file:
+            history = json.load(file)
+        for constraint_key, wins in history['wins'].items():
+            self.wins[constraint_key].update(wins)
+        for constraint_key, seconds in history['seconds'].items():
+            self.seconds[constraint_key].update(seconds)
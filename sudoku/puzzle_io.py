@@ -0,0 +1,225 @@
+"""
+    Streaming reading and writing of puzzle files.
+
+    Supported are the common one-puzzle-per-line formats:
+
+    - 81 characters in row major order, empty cells as `.`, `0`, ` `, `x` or `X`. Other grid sizes
+      (16, 256 or 625 characters) use the letters A-P for the values above 9, see `Sudoku`.
+    - Comma separated values, "12,,3,16,..." with empty cells left blank, see `Sudoku.tokens`.
+    - CSV with a puzzle and a solution column (puzzle,solution), a header line is skipped. Columns of
+      comma separated values are quoted ("12,,3,...","12,5,3,...").
+    - Any of the above compressed with gzip, detected by the `.gz` extension.
+
+    Lines are read and converted one by one, so files of any size are processed with constant memory.
+    Uncompressed files in which every line has the same width can be opened with `PuzzleFile`,
+    which memory maps the file and allows direct access to the Nth puzzle.
+
+"""
+
+import csv
+import gzip
+import mmap
+import sys
+
+from contextlib import nullcontext
+
+from sudoku.peers import BOX_BY_LENGTH, SYMBOLS
+from sudoku.sudoku_wrapper import Sudoku
+
+# Translate the characters of a line to cell values, every invalid character becomes 0xFF.
+INVALID = 0xFF
+EMPTY_MARKERS = b'.0 xX'
+_to_cells = bytearray([INVALID] * 256)
+for _char in EMPTY_MARKERS:
+    _to_cells[_char] = 0
+for _value, _symbol in enumerate(SYMBOLS.encode(), start=1):
+    _to_cells[_symbol] = _value
+TO_CELLS = bytes(_to_cells)
+EMPTY_TOKENS = {b''} | {bytes([char]) for char in EMPTY_MARKERS}
+
+
+def valid_cells(cells):
+    """ The number of cells is a supported grid size and every value fits that size.  """
+    return len(cells) in BOX_BY_LENGTH and max(cells) <= BOX_BY_LENGTH[len(cells)] ** 2
+
+
+def open_file(path, mode='rb'):
+    """ Open a puzzle file, gzip compressed if the name ends with `.gz` and stdin/stdout for `-`.  """
+    if str(path) == '-':
+        return nullcontext(sys.stdin.buffer if 'r' in mode else sys.stdout)
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def split_fields(line):
+    """
+        Split a line in its columns. An unquoted line of comma separated values is a single grid, or a puzzle
+        and a solution grid when it holds twice the number of values of a grid.
+    """
+    if b'"' in line:
+        return [field.encode('latin-1') for field in next(csv.reader([line.decode('latin-1')]))]
+    if b',' not in line:
+        return [line]
+
+    fields = line.split(b',')
+    for length in (len(fields), len(fields) // 2):
+        if length in BOX_BY_LENGTH and not len(fields) % length:
+            return [b','.join(fields[start:start + length]) for start in range(0, len(fields), length)]
+    return fields
+
+
+def field_cells(field):
+    """ Convert a column, a grid of characters or of comma separated values, to cell values.  """
+    if b',' not in field:
+        return field.translate(TO_CELLS)
+    tokens = [token.strip() for token in field.split(b',')]
+    return bytes(min(int(token), INVALID) if token.isdigit() else 0 if token in EMPTY_TOKENS else INVALID
+                 for token in tokens)
+
+
+def parse_line(line):
+    """
+        Convert a single line to a (puzzle cells, solution cells) pair, the solution is None if not present.
+        Returns None for blank lines and comments.
+
+        > parse_line(b'53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79')
+        (b'\\x05\\x03\\x00\\x00\\x07...', None)
+    """
+    line = line.rstrip(b'\r\n')
+    if not line or line.startswith(b'#'):
+        return None
+
+    cells = tuple(map(field_cells, filter(None, split_fields(line)[:2])))  # An empty solution is not solvable.
+    if not all(map(valid_cells, cells)):
+        raise ValueError(f"Not a valid puzzle line: {line[:100]!r}")
+    return cells[0], cells[1] if len(cells) > 1 else None
+
+
+def iter_cells(path, with_solutions=False):
+    """ Yields the raw cells of every puzzle, or (puzzle, solution) pairs when `with_solutions` is set.  """
+    with open_file(path) as file:
+        for number, line in enumerate(file, start=1):
+            try:
+                parsed = parse_line(line)
+            except ValueError as error:
+                if number == 1 and not any(char in b'123456789' for char in line):
+                    continue  # Header line
+                raise ValueError(f"{path}:{number}: {error}") from None
+            if parsed is not None:
+                yield parsed if with_solutions else parsed[0]
+
+
+def read_puzzles(path, raw=False, with_solutions=False):
+    """
+        Lazily read all puzzles from a file.
+
+        :param path: Union[str, PathLike]
+            The puzzle file, gzip compressed when it ends with `.gz`.
+        :param raw: bool
+            Yield the raw cell values as bytes (0 for empty, 1-9 for filled) instead of Sudoku instances.
+        :param with_solutions: bool
+            Yield (puzzle, solution) pairs, the solution is None when the file has no solution column.
+    """
+    convert = bytes if raw else Sudoku.from_cells
+    for item in iter_cells(path, with_solutions):
+        if with_solutions:
+            puzzle, solution = item
+            yield convert(puzzle), convert(solution) if solution is not None else None
+        else:
+            yield convert(item)
+
+
+def to_line(puzzle):
+    """ Convert a Sudoku, raw cells or a flatline to its single line of characters.  """
+    if isinstance(puzzle, Sudoku):
+        return puzzle.flatline
+    if isinstance(puzzle, (bytes, bytearray)):
+        return Sudoku.from_cells(puzzle).flatline
+    return puzzle
+
+
+def write_puzzles(path, puzzles):
+    """
+        Write every puzzle as a single line of characters, returns the number of written puzzles.
+
+        :param puzzles: Iterable[Union[Sudoku, bytes, str]]
+            The puzzles, as Sudoku's, raw cells or flatlines.
+    """
+    count = 0
+    with open_file(path, 'wt' if str(path).endswith('.gz') else 'w') as file:
+        for count, puzzle in enumerate(puzzles, start=1):
+            file.write(f"{to_line(puzzle)}\n")
+    return count
+
+
+def write_solutions(path, pairs):
+    """
+        Write (puzzle, solution) pairs as `puzzle,solution` CSV lines, returns the number of written lines.
+        A solution of None (not solvable) results in an empty solution column.
+    """
+    count = 0
+    with open_file(path, 'wt' if str(path).endswith('.gz') else 'w') as file:
+        file.write("puzzle,solution\n")
+        for count, (puzzle, solution) in enumerate(pairs, start=1):
+            file.write(f"{to_line(puzzle)},{to_line(solution) if solution is not None else ''}\n")
+    return count
+
+
+class PuzzleFile:
+    """
+        Random access to an uncompressed puzzle file in which every line has the same width.
+
+        The file is memory mapped, so only the requested puzzles are read from disk.
+
+        > with PuzzleFile('puzzles.txt') as puzzles:
+        >     sudoku = puzzles[1000000]
+
+        :param path: Union[str, PathLike]
+            The puzzle file, every line holds a single puzzle of the same size.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        end = self.map.find(b'\n')
+        end = end if end != -1 else len(self.map)
+        self.width = end + 1
+        self.length = end - 1 if end > 0 and self.map[end - 1] == ord('\r') else end
+
+        # The last line may lack its line break, then it is exactly the puzzle without the line ending.
+        self.count, rest = divmod(len(self.map), self.width)
+        if self.length not in BOX_BY_LENGTH or rest not in (0, self.length):
+            self.close()
+            raise ValueError(f"{path} is not a fixed width puzzle file")
+        self.count += rest > 0
+
+    def __len__(self):
+        return self.count
+
+    def cells(self, index) -> bytes:
+        """ Returns the raw cells of the puzzle at `index`.  """
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Puzzle index {index} out of range")
+        offset = (index % len(self)) * self.width
+        cells = self.map[offset:offset + self.length].translate(TO_CELLS)
+        if not valid_cells(cells):
+            raise ValueError(f"Not a valid puzzle line at index {index}")
+        return cells
+
+    def __getitem__(self, index) -> Sudoku:
+        return Sudoku.from_cells(self.cells(index))
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
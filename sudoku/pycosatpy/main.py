@@ -52,9 +52,7 @@ def solve_miracle(flatline=None, sudoku=None):
 
 if __name__ == '__main__':
     solve_normal()
-
-    # TODO implement
-    # solve_knight_move_constraint()
-    # solve_kings_move_constraint()
-    # solve_non_consecutive_constraint()
-    # solve_miracle()
+    solve_knight_move_constraint()
+    solve_kings_move_constraint()
+    solve_non_consecutive_constraint()
+    solve_miracle()
@@ -1,19 +1,83 @@
-import itertools
-
 import pycosat
+import time
 
+from functools import lru_cache
+from itertools import count
+from operator import neg
 from sys import intern
-from itertools import product
 
-from sudoku.base_solver import BaseSolver
+from sudoku.base_solver import BaseSolver, BudgetExceeded
+from sudoku.peers import constraint_pairs, layout
 from sudoku.sudoku_wrapper import Sudoku
-from sudoku.pycosatpy.utils import Q
+from sudoku.pycosatpy.utils import Q, at_most
+
+# Propagation limit of the first pycosat call of a run with a timeout, every next call doubles the limit.
+FIRST_PROP_LIMIT = 100000
+
+
+def var(cell, value, size=9):
+    """ The SAT variable that is true when `cell` (0-80) holds `value` (1-9), for a grid of `size` values.  """
+    return size * cell + value
+
+
+def exactly_one(literals, new=None):
+    """
+        Clauses that force exactly one of the literals to be true. Up to 9 literals every pair is excluded,
+        larger groups use the commander encoding with auxiliary variables from `new`, which keeps the number
+        of clauses linear (25 literals: 300 pairs against 70 clauses).
+    """
+    return [tuple(literals)] + at_most(literals, 1, negate=neg, new=new)
+
+
+@lru_cache(maxsize=None)
+def default_clauses(box=3):
+    """
+        The clauses for the default Sudoku rules, these are the same for every puzzle and only built once per size.
+        Returns the clauses and the number of variables, the cell variables followed by the auxiliary variables.
+    """
+    tables = layout(box)
+    size, cnf = tables.size, []
+    new = count(tables.length * size + 1).__next__
+
+    # Every cell contains values in range 1-9
+    for cell in range(tables.length):
+        cnf += exactly_one([var(cell, value, size) for value in range(1, size + 1)], new)
+
+    # These groups all hold distinct values (rows, cols, sub squares)
+    for unit in tables.units:
+        for value in range(1, size + 1):
+            cnf += exactly_one([var(cell, value, size) for cell in unit], new)
+    return tuple(cnf), new() - 1
+
+
+@lru_cache(maxsize=None)
+def constraint_clauses(name, box=3):
+    """
+        The binary clauses of an extra constraint, built once per constraint and size. Every affected pair of
+        cells is visited once: knight and kings move pairs can't hold the same value (pairs that already share
+        a row, column or sub square are skipped), consecutive pairs can't hold values that differ by one.
+    """
+    tables = layout(box)
+    size, cnf = tables.size, []
+    for cell, peer in constraint_pairs(name, box):
+        if name == 'consecutive':
+            for value in range(1, size):
+                cnf.append((-var(cell, value, size), -var(peer, value + 1, size)))
+                cnf.append((-var(cell, value + 1, size), -var(peer, value, size)))
+        elif peer not in tables.unit_peers[cell]:
+            cnf += [(-var(cell, value, size), -var(peer, value, size)) for value in range(1, size + 1)]
+    return tuple(cnf)
 
 
 class SudokuSolverPycosat(BaseSolver):
     """
         Solves Sudoku and variants of Sudoku using Pycosat.
 
+        The clauses are built directly from integer literals, `var(cell, value)` is true when the cell
+        holds the value. The clauses of the default rules are cached, so only the givens and the extra
+        constraints are added per puzzle. The givens are only added when running, so the same solver
+        can be reused for other puzzles, see `BaseSolver.run_puzzle`.
+
         :param flatline: str
             A single line of 81 characters presenting the grid in row major order.
         :param sudoku: 'Sudoku'
@@ -22,62 +86,65 @@ class SudokuSolverPycosat(BaseSolver):
 
     def __init__(self, flatline=None, sudoku=None):
         super().__init__(flatline, sudoku)
-
-        # Convert pos to SAT solver  value.
-        self.symbols = list(map(''.join, product(self.sudoku.positions, map(str, range(1, 10)))))
         self.cnf = []
+        self.variables = 0  # Number of variables in the default clauses.
+        self.aux = {}  # Auxiliary variables of symbolic clauses, numbered after the default variables.
 
         self.solved = None  # Final solved state of the sudoku if possible.
+
+        start = time.perf_counter()
         self.add_default_constraints()
+        self.build_seconds += time.perf_counter() - start
 
     def add_default_constraints(self):
         """ Adding the default Sudoku constraints to the solver.  """
+        clauses, self.variables = default_clauses(self.sudoku.box)
+        self.cnf += clauses
 
-        # Every cell contains values in range 1-9
-        for pos in self.sudoku.positions:
-            self.cnf += self.constraint_one_of(self.create_fact(pos, value) for value in range(1, 10))
-
-        # These groups all hold distinct values (rows, cols, sub squares)
-        for group in self.sudoku.distinct:
-            for value in range(1, 10):
-                self.cnf += self.constraint_one_of(self.create_fact(pos, value) for pos in group)
-
-        # Add the already given information
-        for pos, value in {pos: value for pos, value in self.sudoku.grid.items() if value in '123456789'}.items():
-            self.cnf += self.constraint_basic_fact(self.create_fact(pos, value))
+    def givens(self):
+        """ The already given information as unit clauses, these are added on every run.  """
+        size = self.sudoku.size
+        return [(var(cell, value, size),) for cell, value in enumerate(self.sudoku.cells) if value]
 
     def add_knight_move_constraint(self):
         """ Two cells that are a knight move away have to be different.  """
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='knight_move').items():
-            pass
+        self.cnf += constraint_clauses('knight_move', self.sudoku.box)
 
     def add_kings_move_constraint(self):
         """ All the adjacent cells (including diagonal) have to be different.  """
-        # TODO verify and correct
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='kings_move').items():
-            for neighbour in neighbours:
-                constraints = []
-                for value in range(1, 10):
-                    constraints.extend((self.create_fact(pos, value), self.create_fact('~' + neighbour, value)))
-                self.cnf += self.constraint_none_of(constraints)
+        self.cnf += constraint_clauses('kings_move', self.sudoku.box)
 
     def add_non_consecutive_constraint(self):
         """ Two orthogonal adjacent cells, have to differ by at least 2.  (6, 7 can't be neighbours)"""
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='consecutive').items():
-            pass
+        self.cnf += constraint_clauses('consecutive', self.sudoku.box)
+
+    def add_symbolic(self, cnf):
+        """ Add clauses of symbolic facts ("A1 5", "~A1 5") to the integer clauses.  """
+        self.cnf += [tuple(map(self.fact_to_literal, clause)) for clause in cnf]
 
     def create_fact(self, pos, value):
         'Format a fact (a value assigned to a given point)'
         return intern(f'{pos} {value}')
 
-    def str_to_facts(self, positions, string):
-        'Convert str in row major form to a list of facts'
-        return [self.create_fact(point, value) for point, value in zip(positions, string) if value != ' ']
-
-    def facts_to_str(self, positions, facts):
-        'Convert a list of facts to a string in row major order with blanks for unknowns'
-        point_to_value = {key: val for key, val in (fact.split(' ') for fact in facts)}
-        return ''.join(point_to_value.get(point, ' ') for point in positions)
+    def fact_to_literal(self, fact):
+        'Convert a symbolic fact or auxiliary variable to its integer literal'
+        negated, fact = fact.startswith('~'), fact.lstrip('~')
+        if ' ' in fact:
+            pos, value = fact.split(' ')
+            literal = var(self.sudoku.layout.cells[pos], int(value), self.sudoku.size)
+        else:
+            literal = self.aux.setdefault(fact, self.variables + len(self.aux) + 1)
+        return -literal if negated else literal
+
+    def solution_to_cells(self, solution):
+        'Convert the true literals of a solution to the cell values in row major order'
+        size, length = self.sudoku.size, len(self.sudoku.cells)
+        cells = bytearray(length)
+        for literal in solution:
+            if 0 < literal <= size * length:
+                cell, value = divmod(literal - 1, size)
+                cells[cell] = value + 1
+        return cells
 
     def constraint_all_of(self, elements) -> 'cnf':
         'Forces inclusion of matching rows on a truth table'
@@ -99,72 +166,74 @@ class SudokuSolverPycosat(BaseSolver):
         'Forces exclusion of matching rows on a truth table'
         return Q(elements) == 0
 
-    def make_translate(self, cnf):
-        lit2num = dict()
-        for clause in cnf:
-            for literal in clause:
-                if lit2num.get(literal, None) is None:
-                    var = literal[1:] if literal[0] == '~' else literal
-                    num = len(lit2num) // 2 + 1
-                    lit2num[intern(var)] = num
-                    lit2num[intern('~' + var)] = -num
-        num2var = {num: lit for lit, num in lit2num.items()}
-        return lit2num, num2var
-
-    def translate(self, cnf, uniquify=False):
-        'Translate a symbolic cnf to a numbered cnf and return a reverse mapping'
-        # DIMACS CNF file format:
-        # http://people.sc.fsu.edu/~jburkardt/data/cnf/cnf.html
-        if uniquify:
-            cnf = list(dict.fromkeys(cnf))
-        lit2num, num2var = self.make_translate(cnf)
-        numbered_cnf = [tuple([lit2num[lit] for lit in clause]) for clause in cnf]
-        return numbered_cnf, num2var
-
-    def itersolve(self, symbolic_cnf, include_neg=False):
-        numbered_cnf, num2var = self.translate(symbolic_cnf)
-        for solution in pycosat.itersolve(numbered_cnf):
-            yield [num2var[n] for n in solution if include_neg or n > 0]
-
-    def solve_all(self, symbolic_cnf, include_neg=False):
-        return list(self.itersolve(symbolic_cnf, include_neg))
-
-    def solve_one(self, symbolic_cnf, include_neg=False):
-        return next(self.itersolve(symbolic_cnf, include_neg))
-
-    def run(self):
-        """ Run the actual solver, if successful it will return a new solved Sudoku instance.  """
-        solution = self.solve_one(self.cnf)
+    def run(self, timeout=None, budget=None):
+        """
+            Run the actual solver, if successful it will return a new solved Sudoku instance, see `BaseSolver.run`.
+
+            The budget is the pycosat propagation limit. pycosat can't be interrupted, so with a timeout it is
+            restarted with a doubling propagation limit and the time is checked before every call. The timeout
+            can be exceeded by at most the duration of the last call.
+        """
+        cnf = self.cnf + self.givens()
+        with self.running(timeout, budget) as stats:
+            if stats is not None:
+                stats.details.update(clauses=len(cnf), variables=self.variables + len(self.aux), calls=0)
+
+            limit = FIRST_PROP_LIMIT if timeout is not None else 0  # A limit of 0 is no limit for pycosat.
+            while True:
+                self.check_deadline()
+                if budget is not None and (not limit or limit > budget):
+                    limit = budget
+                solution = pycosat.solve(cnf, prop_limit=limit)
+                if stats is not None:
+                    stats.details['calls'] += 1
+                if solution != 'UNKNOWN' or limit == budget:
+                    break
+                limit *= 2
 
         # From docs: https://pypi.org/project/pycosat/
         if isinstance(solution, str):
             if solution == 'UNSAT':
-                self.sudoku.show()
                 raise ValueError("Sudoku is not solvable\n")
-            raise TimeoutError("A solution could not be determined within the propagation limit")
+            raise BudgetExceeded("A solution could not be determined within the propagation limit")
 
-        solved = self.facts_to_str(self.sudoku.positions, solution)
-        self.solved = Sudoku(solved)
+        self.solved = Sudoku.from_cells(self.solution_to_cells(solution))
         return self.solved
 
+    def iter_solutions(self):
+        """ Yields every solution, auxiliary variables never result in the same solution twice.  """
+        cnf = self.cnf + self.givens()
+        cell_variables = self.sudoku.size * len(self.sudoku.cells)
+        if not self.aux and self.variables == cell_variables:
+            for solution in pycosat.itersolve(cnf):
+                yield Sudoku.from_cells(self.solution_to_cells(solution))
+            return
+
+        # Block found solutions on the cell variables only, so they are not repeated for other auxiliary values.
+        while True:
+            solution = pycosat.solve(cnf)
+            if isinstance(solution, str):
+                return
+            cnf.append(tuple(-literal for literal in solution if 0 < literal <= cell_variables))
+            yield Sudoku.from_cells(self.solution_to_cells(solution))
+
     def run_all(self):
-        solution = []
-        for idx, solution in enumerate(self.itersolve(self.cnf), start=1):
-            solved = self.facts_to_str(self.sudoku.positions, solution)
-            solution.append(Sudoku(solved))
-            self.solved = solution[-1]
+        solutions = []
+        for idx, solved in enumerate(self.iter_solutions(), start=1):
+            solutions.append(solved)
+            self.solved = solutions[-1]
             print(f"\nSolution: {idx}")
             self.show()
-        return solution
+        return solutions
 
-    def show(self, n=3):
+    def show(self, n=None):
         """
             Display the begin state and solved state of the Sudoku, side by side.
 
             :param n: int
-                the grouping size (side of a sub square)
+                the grouping size (side of a sub square), by default the sub square size of the grid
         """
-
+        n = n or self.sudoku.box
         maketrans = str.maketrans({k: '.' for k in ' .xX'})
         flatline_init = self.sudoku.flatline.translate(maketrans)
         flatline_solved = self.solved.flatline.translate(maketrans) if self.solved is not None else flatline_init
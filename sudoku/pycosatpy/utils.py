@@ -9,8 +9,9 @@ Utility functions to humanize interaction with pycosat, taken from US Pycon Dece
 __author__ = 'Raymond Hettinger'
 
 import pycosat  # https://pypi.python.org/pypi/pycosat
-from itertools import combinations
+from itertools import combinations, count
 from functools import lru_cache
+from math import comb
 from sys import intern
 
 
@@ -46,8 +47,21 @@ def translate(cnf, uniquify=False):
 
 
 def itersolve(symbolic_cnf, include_neg=False):
+    'Yield every solution once, auxiliary variables of the cardinality encodings are left out'
     numbered_cnf, num2var = translate(symbolic_cnf)
-    for solution in pycosat.itersolve(numbered_cnf):
+    aux = {num for num, var in num2var.items() if num > 0 and is_aux(var)}
+    if not aux:
+        for solution in pycosat.itersolve(numbered_cnf):
+            yield [num2var[n] for n in solution if include_neg or n > 0]
+        return
+
+    # Block every solution on the real variables only, otherwise it repeats for every auxiliary assignment.
+    while True:
+        solution = pycosat.solve(numbered_cnf)
+        if isinstance(solution, str):
+            return
+        solution = [n for n in solution if abs(n) not in aux]
+        numbered_cnf.append(tuple(-n for n in solution))
         yield [num2var[n] for n in solution if include_neg or n > 0]
 
 
@@ -84,20 +98,130 @@ def from_dnf(groups) -> 'cnf':
     return list(map(tuple, cnf))
 
 
+############### Cardinality encodings ##############################
+#
+# All encodings restrict the number of true elements to at most k. At least k is encoded as
+# at most n - k of the negated elements. Everything except pairwise introduces auxiliary
+# variables, which keeps the number of clauses linear in the number of elements:
+#
+#   pairwise    C(n, k + 1) clauses, no auxiliary variables
+#   sequential  O(n * k) clauses and variables (Sinz, 2005)
+#   commander   O(n) clauses and n / 2 variables, at most one only (Klieber & Kwon, 2007)
+#   totalizer   O(n * k) clauses and O(n log n) variables (Bailleux & Boufkhad, 2003)
+
+ENCODINGS = ('auto', 'pairwise', 'sequential', 'commander', 'totalizer')
+
+_aux_counter = count(1)
+
+
+def aux_variable() -> 'element':
+    'A fresh auxiliary variable'
+    return intern(f'_aux{next(_aux_counter)}')
+
+
+def is_aux(element) -> bool:
+    'True for a variable made by `aux_variable`, negated or not'
+    return element.lstrip('~').startswith('_aux')
+
+
+def pairwise_at_most(elements, k, negate=neg, new=aux_variable) -> 'cnf':
+    'No k + 1 elements are true together'
+    return [tuple(map(negate, group)) for group in combinations(elements, k + 1)]
+
+
+def sequential_at_most(elements, k, negate=neg, new=aux_variable) -> 'cnf':
+    'Sequential counter, register s[i][j] is true when at least j + 1 of the first i + 1 elements are true'
+    n = len(elements)
+    s = [[new() for _ in range(k)] for _ in range(n - 1)]
+    cnf = [(negate(elements[0]), s[0][0])]
+    cnf += [(negate(s[0][j]),) for j in range(1, k)]
+    for i in range(1, n - 1):
+        x = elements[i]
+        cnf += [(negate(x), s[i][0]), (negate(s[i - 1][0]), s[i][0])]
+        for j in range(1, k):
+            cnf += [(negate(x), negate(s[i - 1][j - 1]), s[i][j]), (negate(s[i - 1][j]), s[i][j])]
+        cnf.append((negate(x), negate(s[i - 1][k - 1])))
+    cnf.append((negate(elements[-1]), negate(s[-1][k - 1])))
+    return cnf
+
+
+def commander_at_most_one(elements, negate=neg, new=aux_variable, group=3) -> 'cnf':
+    'Commander encoding, every group gets a commander that is true when one of its elements is true'
+    if len(elements) <= 2 * group:
+        return pairwise_at_most(elements, 1, negate)
+    cnf, commanders = [], []
+    for start in range(0, len(elements), group):
+        members, commander = elements[start:start + group], new()
+        cnf += pairwise_at_most(members, 1, negate)
+        cnf += [(negate(member), commander) for member in members]
+        commanders.append(commander)
+    return cnf + commander_at_most_one(commanders, negate, new, group)
+
+
+def totalizer_at_most(elements, k, negate=neg, new=aux_variable) -> 'cnf':
+    'Totalizer, a tree of unary counters where output o[i] is true when at least i + 1 leaves are true'
+    cnf = []
+
+    def count_true(leaves):
+        if len(leaves) == 1:
+            return list(leaves)
+        left, right = count_true(leaves[:len(leaves) // 2]), count_true(leaves[len(leaves) // 2:])
+        outputs = [new() for _ in range(min(len(leaves), k + 1))]
+        for i in range(len(left) + 1):
+            for j in range(len(right) + 1):
+                if 0 < i + j:
+                    clause = [negate(left[i - 1])] if i else []
+                    clause += [negate(right[j - 1])] if j else []
+                    cnf.append((*clause, outputs[min(i + j, len(outputs)) - 1]))
+        return outputs
+
+    outputs = count_true(tuple(elements))
+    return cnf + [(negate(outputs[k]),)]
+
+
+def at_most(elements, k, encoding='auto', negate=neg, new=aux_variable) -> 'cnf':
+    'At most k of the elements are true'
+    elements = tuple(elements)
+    if k >= len(elements):
+        return []
+    if k < 0:
+        return [()]
+    if k == 0 or encoding == 'pairwise' or (encoding == 'auto' and comb(len(elements), k + 1) <= 4 * len(elements)):
+        return pairwise_at_most(elements, k, negate)
+    if encoding == 'commander' or (encoding == 'auto' and k == 1):
+        if k != 1:
+            raise ValueError("The commander encoding only supports at most one")
+        return commander_at_most_one(elements, negate, new)
+    if encoding in ('auto', 'sequential'):
+        return sequential_at_most(elements, k, negate, new)
+    if encoding == 'totalizer':
+        return totalizer_at_most(elements, k, negate, new)
+    raise ValueError(f"`{encoding}`, valid encodings: {ENCODINGS}")
+
+
+def at_least(elements, k, encoding='auto', negate=neg, new=aux_variable) -> 'cnf':
+    'At least k of the elements are true'
+    elements = tuple(elements)
+    if encoding == 'commander' and len(elements) - k != 1:
+        encoding = 'auto'
+    return at_most(tuple(map(negate, elements)), len(elements) - k, encoding, negate, new)
+
+
 class Q:
     'Quantifier for the number of elements that are true'
 
-    def __init__(self, elements):
+    def __init__(self, elements, encoding='auto'):
         self.elements = tuple(elements)
+        self.encoding = encoding
 
     def __lt__(self, n: int) -> 'cnf':
-        return list(combinations(map(neg, self.elements), n))
+        return at_most(self.elements, n - 1, self.encoding)
 
     def __le__(self, n: int) -> 'cnf':
         return self < n + 1
 
     def __gt__(self, n: int) -> 'cnf':
-        return list(combinations(self.elements, len(self.elements) - n))
+        return at_least(self.elements, n + 1, self.encoding)
 
     def __ge__(self, n: int) -> 'cnf':
         return self > n - 1
@@ -109,7 +233,7 @@ class Q:
         raise NotImplementedError
 
     def __repr__(self) -> str:
-        return f'{self.__class__.__name__}(elements={self.elements!r})'
+        return f'{self.__class__.__name__}(elements={self.elements!r}, encoding={self.encoding!r})'
 
 
 def all_of(elements) -> 'cnf':
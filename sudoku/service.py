@@ -0,0 +1,337 @@
+"""
+    Solve puzzles from asyncio code without blocking the event loop, and serve them over HTTP or JSON lines.
+
+    The solves run in a process pool with every worker keeping its models, see `Session`. At most `limit`
+    puzzles are handed to the pool at once, later requests wait for a slot, and with `max_waiting` requests
+    are refused with `Overloaded` once that many are waiting. Concurrent requests for the same puzzle share a
+    single solve, which is cancelled when the last of its callers times out or is cancelled.
+
+    > async with AsyncSolverPool(engine='z3', workers=4) as pool:
+    >     solved = await pool.solve(flatline, constraints=['knight_move'], timeout=5)
+
+    The front ends answer JSON requests like `{"puzzle": "...", "constraints": ["knight"], "engine": "z3",
+    "timeout": 5}` with `{"status": "solved", "solution": "...", "seconds": 0.01}`:
+
+    > python -m sudoku serve --port 8080
+    > curl -d '{"puzzle": "..."}' http://127.0.0.1:8080/solve
+
+    > python -m sudoku serve --stdin < requests.jsonl
+
+    Requests on stdin are answered in the order they finish, an `id` is copied to the answer and
+    `{"cancel": id}` cancels a pending request.
+
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sudoku.base_solver import SOLVED, UNKNOWN, UNSATISFIABLE, BudgetExceeded, Result
+from sudoku.engines import constraint_names, get_engine
+from sudoku.session import Session, get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error',
+                503: 'Service Unavailable'}
+
+
+class Overloaded(RuntimeError):
+    """ Raised when `max_waiting` requests are already waiting for a slot of the pool.  """
+
+
+def quiet():
+    """ Worker initializer, stdout carries the responses of `serve_lines` so workers print to stderr instead.  """
+    sys.stdout = sys.stderr
+
+
+def attempt(cells, name, constraints, timeout, budget):
+    """ Worker task, returns (status, solved cells or None, seconds, reason) for a single puzzle.  """
+    sudoku = Sudoku.from_cells(cells)
+    result = get_session(get_engine(name), constraints, sudoku.box).attempt(sudoku, timeout=timeout, budget=budget)
+    solved = bytes(result.solved.cells) if result.solved is not None else None
+    return result.status, solved, result.seconds, result.reason
+
+
+class AsyncSolverPool:
+    """
+        Solve puzzles in worker processes from a running event loop, see the module docstring.
+
+        :param engine: str
+            Name of the default engine, see `sudoku.engines.ENGINES`. A request can choose another engine.
+        :param workers: int
+            Number of worker processes, defaults to the number of CPUs.
+        :param limit: int
+            Number of puzzles in the pool at once, defaults to twice the workers so every worker has a next puzzle.
+        :param max_waiting: int
+            Number of requests that may wait for a slot before new requests are refused, None for no limit.
+    """
+
+    def __init__(self, engine='bitmask', workers=None, limit=None, max_waiting=None):
+        get_engine(engine)  # Fail early on unknown names, not on the first request.
+        self.engine = engine
+        self.workers = os.cpu_count() if workers is None else workers
+        self.limit = 2 * self.workers if limit is None else limit
+        self.max_waiting = max_waiting
+        self.executor = None
+        self.slots = None  # Created in `start`, the semaphore belongs to the running loop.
+        self.requests = {}  # Request key -> [solve task, number of callers].
+        self.queued = set()  # Request keys whose solve hasn't taken a slot yet.
+        self.busy = 0  # Slots that are taken.
+        self.counts = Counter()
+
+    async def start(self):
+        if self.executor is None:
+            # Spawned workers don't inherit the sockets of open connections, a forked worker would keep them open.
+            context = multiprocessing.get_context('spawn')
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=quiet)
+            self.slots = asyncio.Semaphore(self.limit)
+        return self
+
+    async def close(self):
+        """ Cancel all pending solves and shut down the worker processes.  """
+        for task, _ in list(self.requests.values()):
+            task.cancel()
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.get_running_loop().run_in_executor(None, partial(executor.shutdown, cancel_futures=True))
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def solve(self, puzzle, constraints=(), engine=None, timeout=None, budget=None) -> Sudoku:
+        """
+            Solve a single puzzle, raises a ValueError if the puzzle is not solvable and `BudgetExceeded`
+            when it is not solved within the limits. See `attempt` for the parameters.
+        """
+        result = await self.attempt(puzzle, constraints, engine, timeout, budget)
+        if result.status == UNKNOWN:
+            raise BudgetExceeded(result.reason)
+        if result.status == UNSATISFIABLE:
+            raise ValueError("Sudoku is not solvable\n")
+        return result.solved
+
+    async def attempt(self, puzzle, constraints=(), engine=None, timeout=None, budget=None) -> Result:
+        """
+            Solve a single puzzle, returns a `Result` with status solved, unsatisfiable or unknown.
+            Raises `Overloaded` when too many requests are waiting, see `max_waiting`.
+
+            :param puzzle: Union[str, bytes, Sudoku]
+                A flatline, raw cells (see `Sudoku.from_cells`) or an already instantiated Sudoku.
+            :param constraints: Iterable[str]
+                Names of extra constraints, see `Sudoku.constraint_directions`.
+            :param engine: str
+                Name of the engine, defaults to the engine of the pool.
+            :param timeout: float
+                Maximum number of seconds, including the time spent waiting for a slot. None for no limit.
+            :param budget: int
+                Maximum amount of search work, see `BaseSolver.run`.
+        """
+        await self.start()
+        start = time.perf_counter()
+        sudoku, engine = Session.to_sudoku(puzzle), engine or self.engine
+        get_engine(engine)
+        key = (engine, tuple(sorted(set(constraints))), bytes(sudoku.cells), timeout, budget)
+
+        entry = self.requests.get(key)
+        if entry is None:
+            if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.counts['overloaded'] += 1
+                raise Overloaded(f"{self.waiting} requests are waiting for the solver pool")
+            self.queued.add(key)
+            entry = self.requests[key] = [asyncio.ensure_future(self.run(key)), 0]
+            entry[0].add_done_callback(lambda _: self.forget(key, entry))
+        else:
+            self.counts['shared'] += 1
+
+        entry[1] += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(entry[0]), timeout)
+        except asyncio.TimeoutError:
+            self.counts['timeouts'] += 1
+            return Result(UNKNOWN, None, time.perf_counter() - start, "timeout", None)
+        except asyncio.CancelledError:
+            self.counts['cancelled'] += 1
+            raise
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                entry[0].cancel()  # No caller is left, free the slot if the solve hasn't finished.
+                self.forget(key, entry)
+
+        self.counts[result.status] += 1
+        return result
+
+    def forget(self, key, entry):
+        """ Remove a finished or cancelled solve, a new request for the same puzzle starts a new one.  """
+        if self.requests.get(key) is entry:
+            del self.requests[key]
+            self.queued.discard(key)
+
+    async def run(self, key) -> Result:
+        """ Solve the puzzle of a request key in a worker process, as soon as a slot is free.  """
+        engine, constraints, cells, timeout, budget = key
+        await self.slots.acquire()
+        self.queued.discard(key)
+        self.busy += 1
+        try:
+            future = self.executor.submit(attempt, cells, engine, constraints, timeout, budget)
+            try:
+                status, solved, seconds, reason = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # A puzzle that is already solving can't be stopped, the slot stays taken until the worker is free.
+                if not future.cancel():
+                    await asyncio.wait([asyncio.wrap_future(future)])
+                raise
+        finally:
+            self.busy -= 1
+            self.slots.release()
+        return Result(status, Sudoku.from_cells(solved) if solved is not None else None, seconds, reason, None)
+
+    @property
+    def waiting(self):
+        """ The number of requests that won't get a slot when the solves that are queued start.  """
+        return max(0, len(self.queued) - (self.limit - self.busy))
+
+    def counters(self):
+        """ The number of answers per status, shared, refused, timed out and cancelled requests, and the load.  """
+        return dict(self.counts, pending=len(self.requests), waiting=self.waiting)
+
+
+async def answer(pool, request):
+    """
+        Answer a JSON request (see the module docstring), returns the HTTP status code and the JSON response.
+        Fields of the request: puzzle, and optional constraints, engine, timeout, budget and id.
+    """
+    try:
+        if not isinstance(request, dict) or not isinstance(request.get('puzzle'), str):
+            raise ValueError("The request must be an object with a puzzle flatline")
+        result = await pool.attempt(request['puzzle'], constraint_names(request.get('constraints', [])),
+                                    request.get('engine'), request.get('timeout'), request.get('budget'))
+        code, response = 200, dict(status=result.status, seconds=result.seconds)
+        if result.status == SOLVED:
+            response['solution'] = result.solved.flatline
+        if result.reason:
+            response['reason'] = result.reason
+    except Overloaded as error:
+        code, response = 503, dict(error=str(error))
+    except (KeyError, TypeError, ValueError) as error:
+        code, response = 400, dict(error=f"{type(error).__name__}: {error}")
+    except Exception as error:
+        code, response = 500, dict(error=f"{type(error).__name__}: {error}")
+
+    if isinstance(request, dict) and 'id' in request:
+        response['id'] = request['id']
+    return code, response
+
+
+async def http_connection(pool, reader, writer):
+    """
+        Handle a single HTTP request: POST /solve with a JSON request, or GET /counters.
+        The solve is cancelled when the client disconnects before it is answered.
+    """
+    try:
+        method, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    except (ValueError, asyncio.IncompleteReadError):
+        writer.close()
+        return
+
+    if method == 'POST' and path == '/solve':
+        try:
+            request = json.loads(body)
+        except ValueError as error:
+            code, response = 400, dict(error=f"Invalid JSON: {error}")
+        else:
+            solving = asyncio.ensure_future(answer(pool, request))
+            closed = asyncio.ensure_future(reader.read())
+            await asyncio.wait([solving, closed], return_when=asyncio.FIRST_COMPLETED)
+            if not solving.done():
+                solving.cancel()
+                writer.close()
+                return
+            closed.cancel()
+            code, response = solving.result()
+    elif method == 'GET' and path == '/counters':
+        code, response = 200, pool.counters()
+    else:
+        code, response = 404, dict(error=f"No such endpoint: {method} {path}")
+
+    content = json.dumps(response).encode()
+    writer.write(f"HTTP/1.1 {code} {HTTP_REASONS[code]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(content)}\r\nConnection: close\r\n\r\n".encode() + content)
+    await writer.drain()
+    writer.close()
+
+
+async def start_http(pool, host='127.0.0.1', port=8080):
+    """ Returns the started `asyncio.Server` for the pool, port 0 picks a free port.  """
+    return await asyncio.start_server(partial(http_connection, pool), host, port)
+
+
+async def serve_http(pool, host='127.0.0.1', port=8080):
+    """ Serve the pool over HTTP until cancelled, see `http_connection`.  """
+    server = await start_http(pool, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+async def serve_lines(pool, source=None, target=None):
+    """
+        Answer JSON requests from `source`, one per line (default stdin), with a JSON line on `target` (default
+        stdout) as soon as each request is finished. Returns when the source is exhausted and all are answered.
+    """
+    source, target = source or sys.stdin, target or sys.stdout
+    loop, tasks, by_id = asyncio.get_running_loop(), set(), {}
+
+    def write(response):
+        target.write(json.dumps(response) + '\n')
+        target.flush()
+
+    async def respond(request):
+        try:
+            write((await answer(pool, request))[1])
+        except asyncio.CancelledError:
+            write(dict(id=request['id'], status='cancelled'))
+
+    while True:
+        line = await loop.run_in_executor(None, source.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            write(dict(error=f"Invalid JSON: {error}"))
+            continue
+
+        identifier = request.get('id') if isinstance(request, dict) else None
+        if isinstance(request, dict) and 'cancel' in request:
+            if request['cancel'] in by_id:
+                by_id[request['cancel']].cancel()
+            continue
+        task = asyncio.ensure_future(respond(request))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        if isinstance(identifier, (str, int)):
+            by_id[identifier] = task
+            task.add_done_callback(lambda _, identifier=identifier: by_id.pop(identifier, None))
+
+    await asyncio.gather(*tasks, return_exceptions=True)
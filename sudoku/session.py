@@ -0,0 +1,88 @@
+"""
+    Solve many puzzles with a single solver, the model for a constraint set is only built once.
+
+    > session = Session(SudokuSolverZ3, constraints=['knight_move'])
+    > for flatline in KNIGHT_CONSTRAINT:
+    >     print(session.solve(flatline).flatline)
+
+"""
+
+from functools import lru_cache
+
+from sudoku.base_solver import Result
+from sudoku.sudoku_wrapper import Sudoku
+
+
+class Session:
+    """
+        Keeps a solver with all rules and extra constraints added, each puzzle only adds its givens.
+
+        :param engine: Type[BaseSolver]
+            The solver class that is used.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param box: int
+            The sub square size of the grids, 3 for 9x9 grids. Every puzzle must have this size.
+    """
+
+    def __init__(self, engine, constraints=(), box=3):
+        self.engine = engine
+        self.constraints = tuple(constraints)
+        self.box = box
+        self.solver = engine(sudoku=Sudoku.from_cells(bytes(box ** 4)))
+        for name in self.constraints:
+            self.solver.add_constraint(name)
+
+    @staticmethod
+    def to_sudoku(puzzle) -> Sudoku:
+        """ Convert a flatline or raw cells (see `Sudoku.from_cells`) to a Sudoku, a Sudoku is returned as is.  """
+        if isinstance(puzzle, (bytes, bytearray)):
+            return Sudoku.from_cells(puzzle)
+        if not isinstance(puzzle, Sudoku):
+            return Sudoku(puzzle)
+        return puzzle
+
+    def prepare(self, puzzle) -> Sudoku:
+        """ Set the puzzle on the solver, raises a ValueError if it has another size than the session.  """
+        sudoku = self.to_sudoku(puzzle)
+        if len(sudoku.cells) != self.box ** 4:
+            size = self.box ** 2
+            raise ValueError(f"A {sudoku.size}x{sudoku.size} puzzle can't be solved in a {size}x{size} session")
+        self.solver.sudoku, self.solver.solved = sudoku, None
+        return sudoku
+
+    def solve(self, puzzle, timeout=None, budget=None) -> Sudoku:
+        """
+            Solve a single puzzle, raises a ValueError if the puzzle is not solvable.
+            Raises `BudgetExceeded` when a limit is reached first, see `BaseSolver.run` for the limits.
+
+            :param puzzle: Union[str, bytes, Sudoku]
+                A flatline, raw cells (see `Sudoku.from_cells`) or an already instantiated Sudoku.
+        """
+        self.prepare(puzzle)
+        return self.solver.run(timeout=timeout, budget=budget)
+
+    def attempt(self, puzzle, timeout=None, budget=None) -> Result:
+        """ Solve a single puzzle within the limits, returns a `Result` with status solved, unsatisfiable or unknown.  """
+        self.prepare(puzzle)
+        return self.solver.attempt(timeout=timeout, budget=budget)
+
+    def iter_solutions(self, puzzle):
+        """ Yields every solution of a single puzzle, see `solve` for the puzzle types.  """
+        self.prepare(puzzle)
+        return self.solver.iter_solutions()
+
+    def count_solutions(self, puzzle, limit=None) -> int:
+        """ Count the solutions of a single puzzle, stops at `limit` solutions.  """
+        self.prepare(puzzle)
+        return self.solver.count_solutions(limit)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(engine={self.engine.__name__}, constraints={self.constraints!r}, "
+                f"box={self.box})")
+
+
+@lru_cache(maxsize=32)
+def get_session(engine, constraints=(), box=3):
+    """ Returns a session for the engine, constraints and grid size, shared by all callers in this process.  """
+    return Session(engine, constraints, box)
@@ -0,0 +1,83 @@
+"""
+    Opt-in statistics of a single solver run and progress reporting outside the search loop.
+
+    > solver = SudokuSolverBitmask(flatline)
+    > solver.enable_stats()
+    > solver.run()
+    > print(solver.stats.as_dict())
+
+    Without `enable_stats` the solvers only check `stats is None` on their counters, so the disabled mode
+    costs next to nothing.
+
+"""
+
+import threading
+
+
+class Stats:
+    """
+        Counters and timings of the last run of a solver, a counter stays 0 if the engine doesn't have it.
+
+        :param engine: str
+            Name of the solver class.
+        :param build_seconds: float
+            Time spent building the model: rules and extra constraints, shared by all runs of the solver.
+    """
+
+    def __init__(self, engine, build_seconds=0.0):
+        self.engine = engine
+        self.build_seconds = build_seconds
+        self.solve_seconds = 0.0
+        self.nodes = 0  # Search nodes visited.
+        self.guesses = 0  # Values tried in a cell (or rows in the exact cover) that were not forced.
+        self.backtracks = 0  # Guesses that were undone.
+        self.propagations = 0  # Values placed or candidates removed by propagation, not by guessing.
+        self.details = {}  # Engine specific numbers, e.g. Z3 `statistics()` or the pycosat clause count.
+
+    def as_dict(self):
+        return dict(engine=self.engine, build_seconds=self.build_seconds, solve_seconds=self.solve_seconds,
+                    nodes=self.nodes, guesses=self.guesses, backtracks=self.backtracks,
+                    propagations=self.propagations, details=dict(self.details))
+
+    def __repr__(self):
+        counters = ', '.join(f"{name}={value}" for name, value in self.as_dict().items() if name != 'details')
+        return f"{self.__class__.__name__}({counters})"
+
+
+class Progress(threading.Thread):
+    """
+        Updates a progress bar from a background thread, the search loop only has to keep its state in attributes.
+
+        :param bar: tqdm
+            The progress bar.
+        :param poll: Callable[[], Tuple[int, dict]]
+            Returns the current progress and the postfix of the bar, called every `interval` seconds.
+        :param interval: float
+            Seconds between two updates.
+    """
+
+    def __init__(self, bar, poll, interval=0.1):
+        super().__init__(daemon=True)
+        self.bar = bar
+        self.poll = poll
+        self.interval = interval
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.update()
+
+    def update(self):
+        n, postfix = self.poll()
+        self.bar.n = n
+        self.bar.set_postfix(postfix, refresh=False)
+        self.bar.refresh()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.join()
+        self.update()
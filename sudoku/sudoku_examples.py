@@ -53,3 +53,29 @@ MIRACLE = [
     # Cracking the cryptic: https://www.youtube.com/watch?v=Tv-48b-KuxI
     ' ' * 7 * 3 + ' 4 ' + ' ' * 1 * 3 + '  3' + ' ' * (6 + 5 * 9)
 ]
+
+# Larger grids use the letters A-P for the values 10-25, see `Sudoku`.
+SIXTEEN = [
+    # Generated: generate(seed='16-1', box=4), minimal
+    '.............F45B.3...D571...C..5.7.C.....F9..8....6F3..AD...E9.'
+    '7.4..5..D...2AF..F..6.A.98C...G3.C6..7E....F..5..9.34..B..2.....'
+    '....G......6..AC.8...6....7.D....2.G..87..B....4D39B....G4.1....'
+    '..B...5...97..6E........EF.8.4..47....62...A.8DB81.2.A..4.....7G',
+
+    # Generated: generate(seed='16-2', box=4), minimal
+    '.9.84..3.....7.AC......2EG...9.8..B.8D.9.4.7.CE...6G1.A......5..'
+    'F........5.G.3....8.53..A9....F....2.81A.CE...G.4........2..DEBC'
+    '..7.....3..54...6...E1G........3...C......A.91DE..D.....1.C..F..'
+    '5.A.....C..3..6...9D...48......B.E......7.4.2.5..1....2CB...A...',
+]
+
+TWENTY_FIVE = [
+    # Generated: generate(seed='25-1', clues=320, box=5)
+    '7..3O..A568IL4C.2.JDKH...2AI..DG..L.F.......O4.6.....D9CH1O..J6E7.P8.4..G.I...4GPB...K2.H....E.D.1..'
+    '..P.H29NI4......7.L..OC.E.....OD.KC.BA9...7.21FE...F..7.NI...C......P.OK.D.DP1.NHAB.J.3EFKMO4.8.....'
+    '5G..6...F.L7H.P9D.NK..2.39E.B.543.P...D..6....I.......835MJ2...6N..F..BP..7J7N5....P.....2.CD93G8...'
+    '1.MP..O.8H.4CGL7.B2E.D..J.B..D.7LC..8.J..4.G..E.ON...9F....G31.PE.LK...A...48..P...L...G..D.37IEMAF6'
+    '..AKJI.9N.EM.3BGF..6P.HLO.2F...P6.3ODJN..A.C.79..B.H.O..8.G.......E24..JD.1G.76..M.DA..F54J8.....I3C'
+    '.MK.3.LP.5JE.O1.H.DN..B..PJD.1.6.HN...7....O.IC3..E5.7.......64.D8G.31...J.N.9FB...1DHL3K.45P...GO.8'
+    '6....73.ME..5.8..IKAH..P.',
+]
@@ -1,87 +1,168 @@
 import logging
 import random
 
-from itertools import product
-from string import ascii_uppercase
-
-from sudoku.sudoku_examples import *
+from sudoku.peers import BOX_BY_LENGTH, CONSTRAINT_DIRECTIONS, SYMBOLS, constraint_peers, layout
+from sudoku.peers import neighbours as cell_neighbours
 
 
 class Sudoku:
+    """
+        Compact representation of a Sudoku grid, 9x9 by default but any size from 4x4 up to 25x25.
+
+        The grid is stored as a `bytearray` of cells in row major order, holding 0 for an empty cell
+        and 1-9 (up to 25) for a filled in cell. The size follows from the number of cells and the unit
+        tables are shared per size, so creating millions of instances only allocates the cells.
+
+        :param flatline: str
+            A single line of 81 characters presenting the grid in row major order. Larger grids use letters
+            for the values above 9 (A=10, B=11, ...), or comma separated numbers ("12,,3,16,...").
+    """
+
+    __slots__ = ('cells',)
+
     # Valid markers for representing that a cell is not filled.
     empty_markers = ' .xX'
 
     # Direction for different constraints that occur in `Cracking the Cryptic`
-    constraint_directions = dict(
-            consecutive=((-1, 0), (1, 0), (0, -1), (0, 1)),
-            kings_move=((1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1)),
-            knight_move=((1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1))
-    )
+    constraint_directions = CONSTRAINT_DIRECTIONS
+
+    # Translation between the characters of a flatline and the cell values.
+    _encode = str.maketrans({**{k: '\x00' for k in empty_markers},
+                             **{symbol: chr(value) for value, symbol in enumerate(SYMBOLS, start=1)}})
+    _decode = bytes.maketrans(bytes(range(len(SYMBOLS) + 1)), ('.' + SYMBOLS).encode())
 
     def __init__(self, flatline=None):
-        self.grid = self.create_grid(flatline=flatline)
-        self.rows = "ABCDEFGHI"
-        self.columns = "123456789"
-        self.positions = list(map(''.join, product(self.rows, self.columns)))  # A1, A2, A3 etc ...
+        self.cells = self.create_cells(flatline=flatline)
+
+    @classmethod
+    def from_cells(cls, cells, trusted=True):
+        """
+            Create a Sudoku directly from the cell values (0 for empty, 1-9 for filled) in row major order.
+
+            :param cells: Union[bytes, bytearray, Iterable[int]]
+                The cell values, bytes are taken over without any conversion.
+            :param trusted: bool
+                Skip validation of the values, for cells that come from a solver or another Sudoku.
+        """
+        sudoku = cls.__new__(cls)
+        sudoku.cells = bytearray(cells)
+        if not trusted:
+            cls.validate_cells(sudoku.cells)
+        return sudoku
+
+    @property
+    def box(self):
+        """ The size of a sub square, 3 for a 9x9 grid.  """
+        return BOX_BY_LENGTH[len(self.cells)]
+
+    @property
+    def size(self):
+        """ The number of rows, columns and values, 9 for a 9x9 grid.  """
+        return self.box ** 2
+
+    @property
+    def layout(self):
+        """ The shared index tables for the size of this grid, see `sudoku.peers.layout`.  """
+        return layout(self.box)
+
+    @property
+    def rows(self):
+        return self.layout.rows
+
+    @property
+    def columns(self):
+        return self.layout.columns
+
+    @property
+    def positions(self):
+        """ A1, A2, A3 etc ...  """
+        return self.layout.positions
 
-        # Default distinct cell conditions for the basic Sudoku problem. Same columns, same row and same sub square.
-        self.distinct = []
-        self.distinct += [[*map(''.join, product(row, self.columns))] for row in self.rows]
-        self.distinct += [[*map(''.join, product(self.rows, col))] for col in self.columns]
-        self.distinct += [[*map(''.join, product(r, c))] for r in ["ABC", "DEF", "GHI"] for c in ["123", "456", "789"]]
+    @property
+    def distinct(self):
+        """ Default distinct cell conditions for the basic Sudoku problem. Same column, row and sub square.  """
+        positions = self.positions
+        return tuple([positions[cell] for cell in unit] for unit in self.layout.units)
 
     @property
     def flatline(self):
         """ Return the flatline representation of the grid, this is property so it is always up to date.  """
-        return ''.join(self.grid.values())
+        return self.cells.translate(self._decode).decode('ascii')
 
-    def create_grid(self, flatline):
+    @property
+    def grid(self):
+        """ Return a mapping of positions and values, dict(A1='7', A2='8', A3='4', A5='.', etc...)  """
+        return dict(zip(self.positions, self.flatline))
+
+    @property
+    def tokens(self):
+        """ Return the comma separated representation of the grid, "12,,3,16,..." with empty cells left blank.  """
+        return ','.join(str(value) if value else '' for value in self.cells)
+
+    def create_cells(self, flatline):
         """
-            Creates a mapping of positions and values, based on string input.
-            Will convert all valid empty markers to the same '.' (dot) variant.
+            Creates the cell values, based on string input.
+            All valid empty markers are converted to 0.
 
             Converts the flatline string '784..' etc ...
-            to a dict(A1=7, A2=8, A3=4, A5=., etc...)
+            to the cell values bytearray([7, 8, 4, 0, 0, etc...])
         """
         if flatline is None:
+            from sudoku.sudoku_examples import HARD_SUDOKU, SIMPLE_SUDOKU
+
             logging.info(f"[!] No grid value was given, replaced by random sudoku example.")
             flatline = random.choice(SIMPLE_SUDOKU + HARD_SUDOKU)
 
+        if ',' in flatline:
+            tokens = [token.strip() for token in flatline.split(',')]
+            invalid = {token for token in tokens if not token.isdigit()} - {'', *self.empty_markers}
+            if invalid:
+                raise ValueError(f"Invalid grid value detected: {invalid}")
+            return self.validate_cells(bytearray(int(token) if token.isdigit() else 0 for token in tokens))
+
         self.validate_flatline(flatline)
-        flatline = flatline.translate(str.maketrans(self.empty_markers, '.' * len(self.empty_markers)))
-        positions = list(map(''.join, product("ABCDEFGHI", "123456789")))
-        grid = dict(zip(positions, flatline))
-        return grid
+        return bytearray(flatline.translate(self._encode), 'ascii')
 
     @staticmethod
     def validate_flatline(flatline):
         """  Validate that the input grid is the right size, and contains only valid inputs. """
-        if len(flatline) != 81:
-            raise ValueError(f"Not a valid 9x9 sudoku {len(flatline)}/81")
-        if any(char not in "123456789" + Sudoku.empty_markers for char in flatline):
-            raise ValueError(f"Invalid grid value detected: {set(flatline) - set('123456789' + Sudoku.empty_markers)}")
+        if len(flatline) not in BOX_BY_LENGTH:
+            raise ValueError(f"Not a valid sudoku {len(flatline)}/{'/'.join(map(str, BOX_BY_LENGTH))}")
+        symbols = SYMBOLS[:BOX_BY_LENGTH[len(flatline)] ** 2] + Sudoku.empty_markers
+        if not set(flatline) <= set(symbols):
+            raise ValueError(f"Invalid grid value detected: {set(flatline) - set(symbols)}")
         return True
 
+    @staticmethod
+    def validate_cells(cells):
+        """  Validate the number of cells and that every value fits the grid size, returns the cells. """
+        if len(cells) not in BOX_BY_LENGTH or max(cells) > BOX_BY_LENGTH[len(cells)] ** 2:
+            raise ValueError(f"Not a valid sudoku {list(cells)}")
+        return cells
+
     def validate_solution(self, grid=None):
-        grid = self.grid if grid is None else grid
+        size = self.size
+        cells = self.cells if grid is None else bytearray(
+                ''.join(grid[pos] for pos in self.positions).translate(self._encode), 'ascii')
 
-        # assert that every cell holds a value in the range of 1 to 9:
-        if not all([cell in "123456789" for cell in grid.values()]):
+        # assert that every cell holds a value in the range of 1 to size:
+        if 0 in cells or max(cells) > size:
             return False
 
         # assert that each unit is solved:
-        return all(set(grid[cell] for cell in unit) == set("123456789") for unit in self.distinct)
+        return all(len(set(cells[cell] for cell in unit)) == size for unit in self.layout.units)
 
-    def show(self, flatline=None, n=3):
+    def show(self, flatline=None, n=None):
         """
             Display grid from a string (values in row major order with blanks for unknowns)
 
         :param flatline: str
             The sudoku problem as a flatline in row major order, if none uses internal flatline.
         :param n: int
-            the grouping size (side of a sub square)
+            the grouping size (side of a sub square), by default the sub square size of this grid
         """
 
+        n = n or self.box
         flatline = self.flatline if flatline is None else flatline
         flatline = flatline.translate(str.maketrans({k: '.' for k in self.empty_markers}))
         fmt = ' | '.join([' %s ' * n] * n)
@@ -109,23 +190,15 @@ class Sudoku:
             ["A2", "B1"]
 
         """
-        position = (self.rows.index(row), int(column))
-        neighbour = []
-        for direction in directions:
-            row, column = (d + p for d, p in zip(direction, position))
-            if ascii_uppercase[row] in self.rows and str(column) in self.columns:
-                neighbour.append(f"{self.rows[row]}{column}")
-        return neighbour
+        positions, cell = self.positions, self.layout.cells[f"{row}{column}"]
+        return [positions[neighbour] for neighbour in cell_neighbours(cell, directions, self.size)]
 
     def constraint_cells(self, name, row, column):
         """ Return all the cells that are affected by the `name` constraint in a specific location. """
-        if self.constraint_directions.get(name, None) is None:
-            raise KeyError(f"`{name}`, valid keys: " + str(list(self.constraint_directions)))
-        return self.neighbours(row, column, self.constraint_directions[name])
+        positions, cell = self.positions, self.layout.cells[f"{row}{column}"]
+        return [positions[neighbour] for neighbour in constraint_peers(name, self.box)[cell]]
 
     def constraint_cells_all(self, name):
         """ Returns a dict of positions and cells that are affected by the `name` constraints for every location.  """
-        if self.constraint_directions.get(name, None) is None:
-            raise KeyError(f"`{name}`, valid keys: " + str(list(self.constraint_directions)))
-        neighbours = [self.neighbours(row, col, self.constraint_directions[name]) for row, col in self.positions]
-        return dict(zip(self.positions, neighbours))
+        positions, table = self.positions, constraint_peers(name, self.box)
+        return {pos: [positions[neighbour] for neighbour in table[cell]] for cell, pos in enumerate(positions)}
@@ -0,0 +1,187 @@
+"""
+    Canonical forms of puzzles, so equivalent puzzles are solved once and share cache entries.
+
+    A transform permutes the cells and relabels the values. The canonical form is the smallest form of all
+    transforms that keep the rules, ordered by the pattern of givens first and the relabeled values second:
+
+    - Plain puzzles: transposition, permutations of the bands (rows of sub squares) and stacks (columns of
+      sub squares), swaps of the rows within a band and of the columns within a stack, and any relabeling
+      of the values. Together these include all rotations and reflections.
+    - Knight and kings move puzzles: only rotations, reflections and transposition, the moves are not kept
+      by swapping bands. Any relabeling of the values.
+    - Non consecutive puzzles: rotations, reflections and transposition, the only relabeling that keeps
+      consecutive values consecutive is reversing them (1 <-> 9).
+
+    Up to 9x9 grids every column order is tried, the rows don't have to be: for a column order the smallest
+    pattern of givens sorts the rows within every band and then the bands, only rows with the same pattern are
+    tried in every order. For 16x16 grids swaps within a band or stack are not searched, larger grids only use
+    rotations, reflections and transposition.
+
+    > flatline, transform = canonical(Sudoku(flatline), constraints=['knight_move'])
+    > solved = transform.restore(get_session(SudokuSolverZ3, ('knight_move',)).solve(flatline))
+
+    Batches are deduplicated by `sudoku.batch.solve_deduplicated`, the solution cache keys on the canonical form.
+
+"""
+
+import numpy as np
+
+from collections import namedtuple
+from functools import lru_cache
+from itertools import permutations, product
+
+from sudoku.sudoku_wrapper import Sudoku
+
+
+class Transform(namedtuple('Transform', ['cells', 'values'])):
+    """
+        A symmetry of the grid, `cells[i]` is the original cell of canonical cell `i` and `values[v]` the
+        canonical value of original value `v` (0 for an empty cell).
+    """
+    __slots__ = ()
+
+    def apply(self, sudoku) -> Sudoku:
+        """ Transform an original grid to the canonical frame.  """
+        original, values = sudoku.cells, self.values
+        return Sudoku.from_cells(bytes(values[original[cell]] for cell in self.cells))
+
+    def restore(self, sudoku) -> Sudoku:
+        """ Transform a grid in the canonical frame (e.g. the solution of the canonical puzzle) back.  """
+        inverse = bytearray(len(self.values))
+        for value, label in enumerate(self.values):
+            inverse[label] = value
+        cells = bytearray(len(self.cells))
+        for position, cell in enumerate(self.cells):
+            cells[cell] = inverse[sudoku.cells[position]]
+        return Sudoku.from_cells(cells)
+
+
+@lru_cache(maxsize=None)
+def cell_transforms(box=3, geometric=False):
+    """
+        All cell permutations as a `(transforms, cells)` array, built once per size. Only rotations, reflections
+        and transposition with `geometric`. Otherwise up to 9x9 grids every column order (stack permutations
+        and swaps within a stack) with and without transposition, the rows are ordered by `order_rows`.
+        16x16 grids get all band and stack permutations with the rotations, reflections and transposition.
+    """
+    size = box * box
+    grid = np.arange(size * size).reshape(size, size)
+    if not geometric and box <= 3:
+        within = list(permutations(range(box)))
+        columns = [np.array([stack * box + column for stack in stacks for column in orders[stack]])
+                   for stacks in permutations(range(box)) for orders in product(within, repeat=box)]
+        transforms = [base[:, order] for base in (grid, grid.T) for order in columns]
+        return np.array(transforms).reshape(len(transforms), -1)
+
+    bases = [grid]
+    if not geometric and box <= 4:
+        bands = [np.concatenate([np.arange(band * box, band * box + box) for band in order])
+                 for order in permutations(range(box))]
+        bases = [grid[np.ix_(rows, columns)] for rows in bands for columns in bands]
+
+    transforms = [np.rot90(image, turns) for base in bases for image in (base, base.T) for turns in range(4)]
+    return np.unique(np.array(transforms).reshape(len(transforms), -1), axis=0)
+
+
+def order_rows(perms, cells, box):
+    """
+        Reorder the rows of every transform to the smallest pattern of givens: the rows within a band are sorted
+        by their pattern, then the bands by their sorted rows. Returns the reordered transforms and the row keys.
+    """
+    size = box * box
+    count = len(perms)
+    rows = perms.reshape(count, size, size)
+    bits = 1 << np.arange(size - 1, -1, -1, dtype=np.int64)
+    keys = ((cells[rows] != 0) @ bits).reshape(count, box, box)  # The pattern of every row as an integer.
+
+    within = np.argsort(keys, axis=2, kind='stable')
+    keys = np.take_along_axis(keys, within, axis=2)
+    bands = np.argsort((keys * (1 << (size * np.arange(box - 1, -1, -1, dtype=np.int64)))).sum(axis=2),
+                       axis=1, kind='stable')
+    order = np.take_along_axis(within + np.arange(0, size, box)[:, None], bands[:, :, None], axis=1)
+    keys = np.take_along_axis(keys, bands[:, :, None], axis=1)
+    return np.take_along_axis(rows, order.reshape(count, size, 1), axis=1).reshape(count, -1), keys
+
+
+def row_ties(perm, keys, box):
+    """
+        Yields the transform with every other order of the rows that have the same pattern, rows within a band
+        and whole bands. Rows without givens are never swapped, that doesn't change the puzzle.
+    """
+    size = box * box
+    rows = perm.reshape(size, size)
+    options = []
+    for band in range(box):
+        groups = {}
+        for position, key in enumerate(keys[band].tolist()):
+            if key:
+                groups.setdefault(key, []).append(band * box + position)
+        options += [[dict(zip(group, order)) for order in permutations(group)]
+                    for group in groups.values() if len(group) > 1]
+    bands = {}
+    for band in range(box):
+        if keys[band].any():
+            bands.setdefault(tuple(keys[band].tolist()), []).append(band)
+    options += [[{band * box + row: other * box + row for band, other in zip(group, order) for row in range(box)}
+                 for order in permutations(group)] for group in bands.values() if len(group) > 1]
+
+    for choice in product(*options):
+        order = list(range(size))
+        for swaps in choice:
+            order = [order[swaps.get(row, row)] for row in range(size)]
+        yield rows[order].reshape(-1)
+
+
+def relabel(row, size, reverse_only=False):
+    """
+        Returns the relabeled row and the value table. Values are numbered in order of first appearance, or
+        with `reverse_only` either kept or reversed, whichever is smaller. Values that don't occur get the
+        remaining labels in order, so the table is a complete permutation.
+    """
+    if reverse_only:
+        identity = bytes(range(size + 1))
+        reverse = bytes([0] + list(range(size, 0, -1)))
+        return min((row.translate(identity + bytes(256 - len(identity))), identity),
+                   (row.translate(reverse + bytes(256 - len(reverse))), reverse))
+
+    seen = [value for value in dict.fromkeys(row) if value]
+    order = seen + sorted(set(range(1, size + 1)).difference(seen))
+    table = bytearray(size + 1)
+    for label, value in enumerate(order, start=1):
+        table[value] = label
+    return row.translate(bytes(table) + bytes(256 - len(table))), bytes(table)
+
+
+def canonical(sudoku, constraints=()):
+    """
+        Returns the canonical flatline of the puzzle for the constraint set, and the `Transform` to it.
+        Equivalent puzzles (see the module docstring) have the same canonical flatline.
+
+        :param sudoku: Sudoku
+            The puzzle.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+    """
+    constraints, box = set(constraints), sudoku.box
+    original = np.frombuffer(sudoku.cells, dtype=np.uint8)
+    perms, keys = cell_transforms(box, geometric=bool(constraints)), None
+    if not constraints and box <= 3:
+        perms, keys = order_rows(perms, original, box)
+    permuted = original[perms]
+
+    # The smallest pattern of givens first, only the transforms with that pattern are relabeled.
+    pattern = np.packbits(permuted != 0, axis=1)
+    first = np.lexsort(pattern.T[::-1])[0]
+    tied = np.flatnonzero((pattern == pattern[first]).all(axis=1))
+    if keys is None:
+        candidates = perms[tied]
+    else:
+        candidates = np.unique([perm for index in tied for perm in row_ties(perms[index], keys[index], box)], axis=0)
+
+    best = None
+    for perm in candidates:
+        cells, values = relabel(original[perm].tobytes(), sudoku.size, reverse_only='consecutive' in constraints)
+        if best is None or cells < best[0]:
+            best = cells, Transform(tuple(perm.tolist()), values)
+    return Sudoku.from_cells(best[0]).flatline, best[1]
+
@@ -0,0 +1,63 @@
+"""
+    Check that puzzles have exactly one solution under their rules.
+
+    The search stops as soon as a second solution is found. Every engine blocks the first solution
+    before it continues the same search, so the second solution never repeats the work for the first one.
+
+    > has_unique_solution(Sudoku(flatline), constraints=['knight_move'])
+    Uniqueness(status='unique', solution=<Sudoku>, seconds=0.0012)
+
+"""
+
+import time
+
+from collections import namedtuple
+from itertools import islice
+
+from sudoku.batch import map_chunks
+from sudoku.bitmask.solver import SudokuSolverBitmask
+from sudoku.session import Session, get_session
+from sudoku.sudoku_wrapper import Sudoku
+
+UNIQUE, MULTIPLE, NONE = 'unique', 'multiple', 'none'
+
+Uniqueness = namedtuple('Uniqueness', ['status', 'solution', 'seconds'])
+Uniqueness.__doc__ = """ The status (unique, multiple or none), the first solution found (or None) and the check time.  """
+
+
+def has_unique_solution(sudoku, constraints=(), engine=SudokuSolverBitmask) -> Uniqueness:
+    """
+        Check whether a puzzle has exactly one solution.
+
+        :param sudoku: Union[str, bytes, Sudoku]
+            A flatline, raw cells (see `Sudoku.from_cells`) or an already instantiated Sudoku.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param engine: Type[BaseSolver]
+            The solver class that is used, the model is built once per process.
+    """
+    start = time.perf_counter()
+    sudoku = Session.to_sudoku(sudoku)
+    solutions = list(islice(get_session(engine, tuple(constraints), sudoku.box).iter_solutions(sudoku), 2))
+    status = (NONE, UNIQUE, MULTIPLE)[len(solutions)]
+    return Uniqueness(status, solutions[0] if solutions else None, time.perf_counter() - start)
+
+
+def check_chunk(chunk, engine=SudokuSolverBitmask, constraints=()):
+    """ Worker task, returns the status, solved cells (or None) and check time of every puzzle in the chunk.  """
+    results = []
+    for puzzle in chunk:
+        status, solution, seconds = has_unique_solution(puzzle, constraints, engine)
+        results.append((status, bytes(solution.cells) if solution is not None else None, seconds))
+    return results
+
+
+def check_many(puzzles, engine=SudokuSolverBitmask, constraints=(), workers=None, chunksize=64, ordered=True):
+    """
+        Check every puzzle of the iterable in a process pool, yields (index, Uniqueness) pairs.
+        See `sudoku.batch.solve_many` for the parameters.
+    """
+    for start, results in map_chunks(check_chunk, puzzles, (engine, tuple(constraints)), workers, chunksize, ordered):
+        for offset, (status, cells, seconds) in enumerate(results):
+            solution = Sudoku.from_cells(cells) if cells is not None else None
+            yield start + offset, Uniqueness(status, solution, seconds)
@@ -0,0 +1,190 @@
+"""
+    Propagate the singles of many puzzles at once with NumPy, only the puzzles that remain unsolved are searched.
+
+    A batch of puzzles is loaded in a `(N, cells, values)` boolean candidate tensor. Naked singles (a cell
+    with a single candidate) are removed from the rows, columns, sub squares and extra constraint peers, and
+    hidden singles (a value with a single place in a unit) are placed, for the whole batch at once until nothing
+    changes. Most easy puzzles are solved by this alone, the residual puzzles are handed to an engine with the
+    propagated cells as givens.
+
+    > for idx, solved in solve_vectorized(flatlines, engine=SudokuSolverPycosat, constraints=['knight_move']):
+    >     print(idx, solved.flatline if solved is not None else 'not solvable')
+
+"""
+
+import time
+
+import numpy as np
+
+from functools import lru_cache
+
+from sudoku.batch import chunked, solve_deduplicated, solve_many, to_sudoku
+from sudoku.bitmask.solver import SudokuSolverBitmask
+from sudoku.peers import layout
+from sudoku.sudoku_wrapper import Sudoku
+
+
+@lru_cache(maxsize=None)
+def peer_indices(name, box=3):
+    """
+        The `name` constraint peers of every cell as a `(cells, peers)` index array, padded with the index of
+        an extra cell (`cells`) that never holds a value.
+    """
+    tables = layout(box)
+    peers = tables.constraint_peers[name]
+    indices = np.full((tables.length, max(map(len, peers))), tables.length, dtype=np.intp)
+    for cell, cell_peers in enumerate(peers):
+        indices[cell, :len(cell_peers)] = cell_peers
+    return indices
+
+
+def candidate_tensor(cells, box=3):
+    """ Convert a `(N, cells)` array of cell values to the `(N, cells, values)` boolean candidate tensor.  """
+    values = np.arange(1, box * box + 1, dtype=cells.dtype)
+    return (cells[:, :, None] == values) | (cells[:, :, None] == 0)
+
+
+def unit_counts(tensor, box):
+    """ Count the true elements of every value in every row, column and sub square, as three `(N, size, size)`.  """
+    n, size = len(tensor), box * box
+    grid = tensor.reshape(n, size, size, size)
+    boxes = tensor.reshape(n, box, box, box, box, size).sum(axis=(2, 4), dtype=np.uint8)
+    return grid.sum(axis=2, dtype=np.uint8), grid.sum(axis=1, dtype=np.uint8), boxes.reshape(n, size, size)
+
+
+def spread(rows, columns, boxes, box):
+    """ Combine per unit values `(N, size, size)` back to every cell, `(N, cells, values)`.  """
+    n, size = len(rows), box * box
+    boxes = np.broadcast_to(boxes.reshape(n, box, 1, box, 1, size), (n, box, box, box, box, size))
+    grid = rows[:, :, None, :] | columns[:, None, :, :] | boxes.reshape(n, size, size, size)
+    return grid.reshape(n, size * size, size)
+
+
+def eliminate(candidates, same, adjacent, box):
+    """ A single round of naked and hidden singles, returns False for the puzzles with a contradiction.  """
+    n, length, size = candidates.shape
+
+    # Naked singles, a placed value is removed from every peer.
+    fixed = candidates & (candidates.sum(axis=2, dtype=np.uint8, keepdims=True) == 1)
+    rows, columns, boxes = unit_counts(fixed, box)
+    valid = ((rows <= 1) & (columns <= 1) & (boxes <= 1)).all(axis=(1, 2))
+    banned = spread(rows > 0, columns > 0, boxes > 0, box) & ~fixed
+
+    if same or adjacent is not None:
+        padded = np.zeros((n, length + 1, size), dtype=bool)
+        padded[:, :length] = fixed
+        for indices in same:
+            banned |= padded[:, indices].any(axis=2)
+        if adjacent is not None:
+            neighbours = padded[:, adjacent].any(axis=2)
+            banned[:, :, 1:] |= neighbours[:, :, :-1]
+            banned[:, :, :-1] |= neighbours[:, :, 1:]
+    candidates &= ~banned
+
+    # Hidden singles, a value with a single place in a row, column or sub square is placed there.
+    rows, columns, boxes = unit_counts(candidates, box)
+    valid &= ((rows > 0) & (columns > 0) & (boxes > 0)).all(axis=(1, 2))
+    hidden = candidates & spread(rows == 1, columns == 1, boxes == 1, box)
+    candidates &= np.where(hidden.any(axis=2, keepdims=True), hidden, True)
+    return valid & candidates.any(axis=2).all(axis=1)
+
+
+def propagate(candidates, constraints=(), box=3):
+    """
+        Apply naked and hidden singles to every puzzle until nothing changes, the candidates are updated in place.
+        Returns a boolean array, False for the puzzles with a contradiction (not solvable).
+
+        Every round only the puzzles that changed in the previous round are processed, so a few slow puzzles
+        don't keep the whole batch busy.
+
+        :param candidates: np.ndarray
+            The `(N, cells, values)` boolean candidate tensor, see `candidate_tensor`.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param box: int
+            The sub square size of the puzzles, 3 for 9x9.
+    """
+    same = [peer_indices(name, box) for name in constraints if name != 'consecutive']
+    adjacent = peer_indices('consecutive', box) if 'consecutive' in constraints else None
+
+    valid = np.ones(len(candidates), dtype=bool)
+    remaining = candidates.sum(axis=(1, 2))
+    active = np.arange(len(candidates))
+    while len(active):
+        subset = candidates[active]
+        subset_valid = eliminate(subset, same, adjacent, box)
+        candidates[active] = subset
+        valid[active] = subset_valid
+
+        count = subset.sum(axis=(1, 2))
+        changed = count != remaining[active]
+        remaining[active] = count
+        active = active[changed & subset_valid]
+    return valid
+
+
+def solve_vectorized(puzzles, engine=SudokuSolverBitmask, constraints=(), batch_size=4096, workers=1,
+                     chunksize=64, with_timing=False, timeout=None, budget=None, cache=None, dedupe=False):
+    """
+        Solve every puzzle of the iterable, yields (index, solved Sudoku or None) pairs in input order.
+
+        :param puzzles: Iterable[Union[str, bytes, Sudoku]]
+            The puzzles as flatlines, raw cells or instantiated Sudoku's, consumed lazily.
+        :param engine: Type[BaseSolver]
+            The solver class for the puzzles that are not solved by singles, any `BaseSolver` subclass.
+        :param constraints: Iterable[str]
+            Names of extra constraints, see `Sudoku.constraint_directions`.
+        :param batch_size: int
+            Number of puzzles that are propagated together.
+        :param workers: int
+            Number of worker processes for the residual puzzles, see `sudoku.batch.solve_many`.
+        :param chunksize: int
+            Number of residual puzzles that are sent to a worker in a single task.
+        :param with_timing: bool
+            Yield (index, solved Sudoku or None, seconds), the propagation time is shared by all puzzles of a batch.
+        :param timeout: float
+            Maximum number of seconds per residual puzzle, see `sudoku.batch.solve_many`.
+        :param budget: int
+            Maximum amount of search work per residual puzzle, see `BaseSolver.run`.
+        :param cache: Union[bool, str]
+            Cache the solutions of the residual puzzles, see `sudoku.batch.solve_one`.
+        :param dedupe: bool
+            Search equivalent residual puzzles only once, see `sudoku.batch.solve_deduplicated`.
+    """
+    constraints = tuple(constraints)
+    search = solve_deduplicated if dedupe else solve_many
+    for start, chunk in chunked(puzzles, batch_size):
+        sudokus = [to_sudoku(puzzle) for puzzle in chunk]
+        results = [None if sudoku is not None else (None, 0.0) for sudoku in sudokus]  # Malformed puzzles.
+
+        # Every grid size is propagated as its own batch.
+        for box in sorted({sudoku.box for sudoku in sudokus if sudoku is not None}):
+            offsets = [offset for offset, sudoku in enumerate(sudokus) if sudoku is not None and sudoku.box == box]
+            begin = time.perf_counter()
+            cells = np.frombuffer(b''.join(sudokus[offset].cells for offset in offsets), dtype=np.uint8)
+            candidates = candidate_tensor(cells.reshape(len(offsets), -1), box)
+            valid = propagate(candidates, constraints, box)
+
+            counts = candidates.sum(axis=2)
+            solved = valid & (counts == 1).all(axis=1)
+            values = np.where(counts == 1, candidates.argmax(axis=2) + 1, 0).astype(np.uint8)
+            elapsed = (time.perf_counter() - begin) / len(offsets)
+
+            residual, reduced = [], []
+            for offset, is_valid, is_solved, row in zip(offsets, valid, solved, values):
+                if is_solved:
+                    results[offset] = (Sudoku.from_cells(row.tobytes()), elapsed)
+                elif is_valid:
+                    residual.append(offset)
+                    reduced.append(row.tobytes())
+                else:
+                    results[offset] = (None, elapsed)
+
+            # The remaining puzzles are searched with the propagated cells as givens.
+            searched = search(reduced, engine=engine, constraints=constraints, workers=workers, chunksize=chunksize,
+                              with_timing=True, timeout=timeout, budget=budget, cache=cache)
+            for offset, (_, sudoku, seconds) in zip(residual, searched):
+                results[offset] = (sudoku, elapsed + seconds)
+
+        for offset, (sudoku, seconds) in enumerate(results):
+            yield (start + offset, sudoku, seconds) if with_timing else (start + offset, sudoku)
@@ -1,8 +1,20 @@
-from z3 import Solver, Int, Or, Distinct, sat
+import time
 
-from sudoku.base_solver import BaseSolver
+from z3 import And, BitVec, Bool, Distinct, Int, Not, Or, PbEq, Solver, SolverFor, Then, ULE, is_true, sat, unknown
+
+from sudoku.base_solver import BaseSolver, BudgetExceeded
+from sudoku.peers import constraint_pairs
 from sudoku.sudoku_wrapper import Sudoku
 
+# Ways to represent a single cell in Z3.
+#   int     An unbounded integer, restricted to 1-9 (arithmetic theory).
+#   bitvec  A bit vector with range bounds (bit-vector theory), 4 bits for 9x9 and 5 bits up to 25x25.
+#   onehot  A boolean per value with exactly one true, only boolean and pseudo-boolean constraints.
+ENCODINGS = ('int', 'bitvec', 'onehot')
+
+# The Z3 parameter value without a limit, for `timeout` (milliseconds) and `max_conflicts`.
+NO_LIMIT = 4294967295
+
 
 class SudokuSolverZ3(BaseSolver):
     """
@@ -17,92 +29,216 @@ class SudokuSolverZ3(BaseSolver):
             A single line of 81 characters presenting the grid in row major order.
         :param sudoku: 'Sudoku'
             An already instantiated Sudoku representation.
+        :param encoding: str
+            How a single cell is represented, one of `ENCODINGS` (default: int).
+        :param tactic: Union[str, Tuple[str, ...]]
+            A logic for `SolverFor` (e.g. "QF_FD") or the names of a tactic pipeline, None for the default solver.
 
 
     """
+    encoding = 'int'
+    tactic = None
 
-    def __init__(self, flatline=None, sudoku=None):
+    def __init__(self, flatline=None, sudoku=None, encoding=None, tactic=None):
         super().__init__(flatline, sudoku)
-
-        self.symbols = {pos: Int(pos) for pos in self.sudoku.positions}  # Convert pos to SAT solver value.
-        self.solver = Solver()
+        self.encoding = encoding or self.encoding
+        self.tactic = tactic or self.tactic
+        if self.encoding not in ENCODINGS:
+            raise ValueError(f"`{self.encoding}`, valid encodings: {ENCODINGS}")
+
+        # Convert pos to SAT solver value.
+        start = time.perf_counter()
+        self.symbols = {pos: self.create_symbol(pos) for pos in self.sudoku.positions}
+        self.solver = self.create_solver()
         self.solved = None  # Final solved state of the sudoku if possible.
 
         self.add_default_constraints()
+        self.build_seconds += time.perf_counter() - start
+
+    def create_symbol(self, pos):
+        """ The Z3 representation of a single cell, based on the encoding.  """
+        size = self.sudoku.size
+        if self.encoding == 'bitvec':
+            return BitVec(pos, size.bit_length())
+        if self.encoding == 'onehot':
+            return tuple(Bool(f"{pos} {value}") for value in range(1, size + 1))
+        return Int(pos)
+
+    def create_solver(self):
+        """ The default solver, a solver for a specific logic or a tactic pipeline.  """
+        if self.tactic is None:
+            return Solver()
+        if isinstance(self.tactic, str):
+            return SolverFor(self.tactic)
+        return Then(*self.tactic).solver()
 
     def add_default_constraints(self):
         """ Adding the default Sudoku constraints to the solver.  """
 
         # Every cell contains values in range 1-9
         for pos in self.sudoku.positions:
-            self.constraint_one_of(self.symbols[pos], range(1, 10))
+            self.constraint_one_of(self.symbols[pos], range(1, self.sudoku.size + 1))
 
         # These groups all hold distinct values (rows, cols, sub squares)
         for group in self.sudoku.distinct:
             self.constraint_distinct(group)
 
-        # Add the already given information
-        for pos, value in {pos: value for pos, value in self.sudoku.grid.items() if value in '123456789'}.items():
-            self.constraint_equal(self.symbols[pos], value)
+        # Redundant for the rules, but without it bit vectors can't find hidden singles on larger grids.
+        if self.encoding == 'bitvec' and self.sudoku.size > 9:
+            for group in self.sudoku.distinct:
+                for value in range(1, self.sudoku.size + 1):
+                    self.solver.add(Or([self.symbols[pos] == value for pos in group]))
+
+    def add_givens(self):
+        """ Add the already given information, this is done on every run inside a push/pop scope.  """
+        for pos, value in zip(self.sudoku.positions, self.sudoku.cells):
+            if value:
+                self.constraint_equal(self.symbols[pos], value)
 
     def add_knight_move_constraint(self):
         """ Two cells that are a knight move away have to be different.  """
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='knight_move').items():
-            for neighbour in neighbours:
-                self.constraint_not_equal(self.symbols[pos], self.symbols[neighbour])
+        positions = self.sudoku.positions
+        for cell, neighbour in constraint_pairs('knight_move', self.sudoku.box):
+            self.constraint_not_equal(self.symbols[positions[cell]], self.symbols[positions[neighbour]])
 
     def add_kings_move_constraint(self):
-        """ All the adjacent cells (including diagonal) have to differ by at least 2.   (6, 7 can't be neighbours) """
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='kings_move').items():
-            for neighbour in neighbours:
-                self.constraint_not_equal(self.symbols[pos], self.symbols[neighbour])
+        """ All the adjacent cells (including diagonal) have to be different.  """
+        positions = self.sudoku.positions
+        for cell, neighbour in constraint_pairs('kings_move', self.sudoku.box):
+            self.constraint_not_equal(self.symbols[positions[cell]], self.symbols[positions[neighbour]])
 
     def add_non_consecutive_constraint(self):
         """ Two orthogonal adjacent cells, have to differ by at least 2.  (6, 7 can't be neighbours)"""
-        for pos, neighbours in self.sudoku.constraint_cells_all(name='consecutive').items():
-            for neighbour in neighbours:
-                self.constraint_non_consecutive(self.symbols[pos], self.symbols[neighbour])
+        positions = self.sudoku.positions
+        for cell, neighbour in constraint_pairs('consecutive', self.sudoku.box):
+            self.constraint_non_consecutive(self.symbols[positions[cell]], self.symbols[positions[neighbour]])
 
     def constraint_one_of(self, pos, iterable):
         """ All elements are one of the following values.  """
-        self.solver.add(Or([pos == i for i in iterable]))
+        values = list(iterable)
+        if self.encoding == 'onehot':
+            self.solver.add(PbEq([(pos[i - 1], 1) for i in values], 1))
+            self.solver.add(*[Not(pos[i - 1]) for i in range(1, len(pos) + 1) if i not in values])
+        elif self.encoding == 'bitvec' and values == list(range(values[0], values[-1] + 1)):
+            self.solver.add(ULE(values[0], pos), ULE(pos, values[-1]))
+        else:
+            self.solver.add(Or([pos == i for i in values]))
 
     def constraint_distinct(self, iterable):
         """ All elements are different.  """
-        self.solver.add(Distinct([self.symbols[elem] for elem in iterable]))
+        if self.encoding == 'onehot':
+            for value in range(self.sudoku.size):
+                self.solver.add(PbEq([(self.symbols[elem][value], 1) for elem in iterable], 1))
+        else:
+            self.solver.add(Distinct([self.symbols[elem] for elem in iterable]))
 
     def constraint_equal(self, pos1, pos2):
         """ The two elements have to be the same, equal.  """
-        self.solver.add(pos1 == pos2)
+        if self.encoding == 'onehot':
+            self.solver.add(pos1[pos2 - 1])
+        else:
+            self.solver.add(pos1 == pos2)
 
     def constraint_not_equal(self, pos1, pos2):
         """ The two elements have to be different.  """
-        self.solver.add(pos1 != pos2)
+        if self.encoding == 'onehot':
+            self.solver.add(*[Or(Not(a), Not(b)) for a, b in zip(pos1, pos2)])
+        else:
+            self.solver.add(pos1 != pos2)
 
     def constraint_non_consecutive(self, pos1, pos2):
         """ The two elements can't be 1 step away.  """
-        self.constraint_not_equal(pos1, pos2 - 1)
-        self.constraint_not_equal(pos1, pos2 + 1)
-
-    def run(self) -> Sudoku:
-        """ Run the actual solver, if successful it will return a new solved Sudoku instance.  """
-        if self.solver.check() != sat:
-            self.sudoku.show()
-            raise ValueError("Sudoku is not solvable\n")
-        model = self.solver.model()
-        solved = {pos: model[s] for pos, s in self.symbols.items()}
-        self.solved = Sudoku(''.join(map(str, solved.values())))
+        if self.encoding == 'onehot':
+            for value in range(len(pos1) - 1):
+                self.solver.add(Not(And(pos1[value], pos2[value + 1])), Not(And(pos1[value + 1], pos2[value])))
+        else:
+            self.constraint_not_equal(pos1, pos2 - 1)
+            self.constraint_not_equal(pos1, pos2 + 1)
+
+    def decode(self, model, symbol):
+        """ The value of a single cell in the model.  """
+        if self.encoding == 'onehot':
+            return next(value for value, b in enumerate(symbol, start=1) if is_true(model.eval(b)))
+        return model[symbol].as_long()
+
+    def run(self, timeout=None, budget=None) -> Sudoku:
+        """
+            Run the actual solver, if successful it will return a new solved Sudoku instance, see `BaseSolver.run`.
+            The budget is the maximum number of conflicts, both limits are reset after the run.
+        """
+        limited = timeout is not None or budget is not None
+        if limited:
+            self.solver.set(timeout=NO_LIMIT if timeout is None else max(1, int(timeout * 1000)),
+                            max_conflicts=NO_LIMIT if budget is None else budget)
+        self.solver.push()
+        try:
+            with self.running(budget=budget) as stats:
+                self.add_givens()
+                result = self.solver.check()
+            if stats is not None:
+                self.collect_statistics(stats)
+            if result == unknown:
+                raise BudgetExceeded(f"Z3 returned unknown: {self.solver.reason_unknown()}")
+            if result != sat:
+                raise ValueError("Sudoku is not solvable\n")
+            model = self.solver.model()
+            self.solved = Sudoku.from_cells(self.decode(model, s) for s in self.symbols.values())
+        finally:
+            self.solver.pop()
+            if limited:
+                self.solver.set(timeout=NO_LIMIT, max_conflicts=NO_LIMIT)
         return self.solved
 
-    def show(self, n=3):
+    def collect_statistics(self, stats):
+        """ Copy the Z3 statistics of the last check, the main counters of both Z3 cores are also summarized.  """
+        statistics = self.solver.statistics()
+        stats.details.update((key, statistics.get_key_value(key)) for key in statistics.keys())
+        for name, key in (('guesses', 'decisions'), ('backtracks', 'conflicts'), ('propagations', 'propagations')):
+            setattr(stats, name, sum(value for detail, value in stats.details.items()
+                                     if detail in (key, f"sat {key}") or detail.startswith(f"sat {key} ")))
+
+    def iter_solutions(self):
+        """ Yields every solution, each found solution is blocked on all cells before searching the next.  """
+        self.solver.push()
+        try:
+            self.add_givens()
+            while self.solver.check() == sat:
+                model = self.solver.model()
+                values = [self.decode(model, s) for s in self.symbols.values()]
+                yield Sudoku.from_cells(values)
+                self.solver.add(Or([self.blocking(s, value) for s, value in zip(self.symbols.values(), values)]))
+        finally:
+            self.solver.pop()
+
+    def blocking(self, symbol, value):
+        """ The cell does not hold this value.  """
+        if self.encoding == 'onehot':
+            return Not(symbol[value - 1])
+        return symbol != value
+
+    def show(self, n=None):
         """
             Display the begin state and solved state of the Sudoku, side by side.
 
             :param n: int
-                the grouping size (side of a sub square)
+                the grouping size (side of a sub square), by default the sub square size of the grid
         """
+        n = n or self.sudoku.box
         maketrans = str.maketrans({k: '.' for k in ' .xX'})
         flatline_init = self.sudoku.flatline.translate(maketrans)
         flatline_solved = self.solved.flatline.translate(maketrans) if self.solved is not None else flatline_init
-        print(f"\n\nBegin state and solved state of the Sudoku (valid={self.solved.validate_solution()})\n")
+        valid_solution = self.solved.validate_solution() if self.solved is not None else 'FAILED'
+        print(f"\n\nBegin state and solved state of the Sudoku (valid={valid_solution})\n")
         self.render(flatline_init, flatline_solved, n=n)
+
+
+class SudokuSolverZ3BitVec(SudokuSolverZ3):
+    """ Every cell is a bit vector of `size.bit_length()` bits (4 for 9x9), solved with the finite domain solver.  """
+    encoding = 'bitvec'
+    tactic = 'QF_FD'
+
+
+class SudokuSolverZ3OneHot(SudokuSolverZ3):
+    """ Every cell is one boolean per value with exactly one true, solved with the finite domain solver.  """
+    encoding = 'onehot'
+    tactic = 'QF_FD'
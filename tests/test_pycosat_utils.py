@@ -0,0 +1,34 @@
+"""
+    Tests of the symbolic pycosat helpers with the cardinality encodings.
+
+    > python -m pytest tests
+"""
+
+from math import comb
+
+import pytest
+
+pytest.importorskip('pycosat')
+
+from sudoku.pycosatpy.utils import ENCODINGS, Q, solve_all, solve_one  # noqa: E402
+
+ELEMENTS = [f'x{i}' for i in range(10)]
+
+
+@pytest.mark.parametrize('encoding', [encoding for encoding in ENCODINGS if encoding != 'commander'])
+def test_solve_all_counts_real_solutions_once(encoding):
+    solutions = solve_all(Q(ELEMENTS, encoding) <= 2)
+    assert len(solutions) == sum(comb(len(ELEMENTS), k) for k in range(3))
+    assert len({frozenset(solution) for solution in solutions}) == len(solutions)
+    assert all(set(solution) <= set(ELEMENTS) for solution in solutions)
+
+
+def test_exactly_one_with_commander_encoding():
+    solutions = solve_all(Q(ELEMENTS, 'commander') == 1)
+    assert sorted(solutions) == [[element] for element in ELEMENTS]
+
+
+def test_solve_one_leaves_out_auxiliary_variables():
+    solution = solve_one(Q(ELEMENTS) == 3, include_neg=True)
+    assert sorted(literal.lstrip('~') for literal in solution) == sorted(ELEMENTS)
+    assert sum(not literal.startswith('~') for literal in solution) == 3
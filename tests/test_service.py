@@ -0,0 +1,127 @@
+"""
+    Tests of the asyncio solver pool and its front ends, with a local client.
+
+    > python -m pytest tests
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+from sudoku.base_solver import SOLVED, UNKNOWN, UNSATISFIABLE
+from sudoku.service import AsyncSolverPool, Overloaded, serve_lines, start_http
+from sudoku.sudoku_examples import HARD_SUDOKU, KNIGHT_CONSTRAINT, SIMPLE_SUDOKU
+from sudoku.sudoku_wrapper import Sudoku
+
+UNSOLVABLE = '11' + '.' * 79
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def request(port, method, path, body=b''):
+    """ A minimal HTTP client, returns the status code and the decoded JSON response.  """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                 + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+def test_solve():
+    async def main():
+        async with AsyncSolverPool(workers=1) as pool:
+            solved = await pool.solve(SIMPLE_SUDOKU[0])
+            assert solved.validate_solution()
+            with pytest.raises(ValueError):
+                await pool.solve(UNSOLVABLE)
+
+    run(main())
+
+
+def test_http_round_trip():
+    async def main():
+        async with AsyncSolverPool(workers=1) as pool:
+            server = await start_http(pool, port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                body = json.dumps(dict(puzzle=KNIGHT_CONSTRAINT[0], constraints=['knight'], id=7)).encode()
+                code, response = await request(port, 'POST', '/solve', body)
+                assert code == 200 and response['status'] == SOLVED and response['id'] == 7
+                assert Sudoku(response['solution']).validate_solution()
+
+                code, response = await request(port, 'POST', '/solve', json.dumps(dict(puzzle=UNSOLVABLE)).encode())
+                assert code == 200 and response['status'] == UNSATISFIABLE
+
+                code, _ = await request(port, 'POST', '/solve', b'{"puzzle": "123"}')
+                assert code == 400
+                code, _ = await request(port, 'POST', '/solve', b'not json')
+                assert code == 400
+                code, _ = await request(port, 'GET', '/unknown')
+                assert code == 404
+                code, response = await request(port, 'GET', '/counters')
+                assert code == 200 and response[SOLVED] == 1
+
+    run(main())
+
+
+def test_json_lines_round_trip():
+    lines = [dict(id=1, puzzle=SIMPLE_SUDOKU[0]), dict(id=2, puzzle=UNSOLVABLE, engine='dlx'), 'no puzzle']
+    source, target = io.StringIO('\n'.join(map(json.dumps, lines)) + '\nnot json\n'), io.StringIO()
+
+    async def main():
+        async with AsyncSolverPool(workers=1) as pool:
+            await serve_lines(pool, source, target)
+
+    run(main())
+    responses = [json.loads(line) for line in target.getvalue().splitlines()]  # Only JSON on the stream.
+    by_id = {response.get('id'): response for response in responses}
+    assert len(responses) == 4
+    assert by_id[1]['status'] == SOLVED and Sudoku(by_id[1]['solution']).validate_solution()
+    assert by_id[2]['status'] == UNSATISFIABLE
+    assert sum('error' in response for response in responses) == 2
+
+
+def test_identical_requests_share_a_solve():
+    async def main():
+        async with AsyncSolverPool(workers=1) as pool:
+            results = await asyncio.gather(*[pool.attempt(HARD_SUDOKU[0]) for _ in range(5)])
+            assert [result.status for result in results] == [SOLVED] * 5
+            assert len({id(result) for result in results}) == 1
+            assert pool.counters()['shared'] == 4
+
+    run(main())
+
+
+def test_timeout_is_unknown():
+    async def main():
+        async with AsyncSolverPool(workers=1) as pool:
+            result = await pool.attempt(HARD_SUDOKU[0], engine='backtracking', timeout=0.05)
+            assert result.status == UNKNOWN and result.solved is None
+            assert pool.counters()['timeouts'] == 1
+
+            # The pool keeps working after a timed out request.
+            assert (await pool.attempt(SIMPLE_SUDOKU[0])).status == SOLVED
+
+    run(main())
+
+
+def test_overloaded():
+    async def main():
+        async with AsyncSolverPool(workers=1, limit=1, max_waiting=1) as pool:
+            results = await asyncio.gather(*[pool.attempt(puzzle) for puzzle in HARD_SUDOKU[:3]],
+                                           return_exceptions=True)
+            assert [result.status for result in results[:2]] == [SOLVED, SOLVED]
+            assert isinstance(results[2], Overloaded)
+            assert pool.counters()['overloaded'] == 1
+
+            # A refused request can be retried once the pool has room.
+            assert (await pool.attempt(HARD_SUDOKU[2])).status == SOLVED
+
+    run(main())
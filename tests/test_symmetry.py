@@ -0,0 +1,46 @@
+"""
+    Tests of the canonical form of puzzles under their symmetries.
+
+    > python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from sudoku.dlx.solver import SudokuSolverDLX  # noqa: E402
+from sudoku.sudoku_examples import HARD_SUDOKU, SIMPLE_SUDOKU  # noqa: E402
+from sudoku.sudoku_wrapper import Sudoku  # noqa: E402
+from sudoku.symmetry import canonical  # noqa: E402
+
+
+def shuffle(flatline, rng):
+    """ A random equivalent puzzle, shuffles bands, rows, stacks, columns, transposition and digits.  """
+    grid = np.frombuffer(Sudoku(flatline).cells, dtype=np.uint8).reshape(9, 9)
+    rows = [band * 3 + row for band in rng.sample(range(3), 3) for row in rng.sample(range(3), 3)]
+    columns = [stack * 3 + column for stack in rng.sample(range(3), 3) for column in rng.sample(range(3), 3)]
+    grid = grid[np.ix_(rows, columns)]
+    grid = grid.T if rng.random() < 0.5 else grid
+    digits = [0] + rng.sample(range(1, 10), 9)
+    return Sudoku.from_cells(bytes(digits[value] for value in grid.reshape(-1)))
+
+
+@pytest.mark.parametrize('flatline', SIMPLE_SUDOKU[:2] + HARD_SUDOKU[:2] + ['12' + '.' * 7 + '3' + '.' * 71])
+def test_equivalent_puzzles_share_the_canonical_form(flatline):
+    rng = random.Random(flatline)
+    expected, _ = canonical(Sudoku(flatline))
+    for _ in range(10):
+        sudoku = shuffle(flatline, rng)
+        key, transform = canonical(sudoku)
+        assert key == expected
+        assert transform.apply(sudoku).flatline == key
+
+
+def test_restore_maps_the_canonical_solution_back():
+    sudoku = shuffle(HARD_SUDOKU[0], random.Random(0))
+    key, transform = canonical(sudoku)
+    solved = transform.restore(SudokuSolverDLX(key).run())
+    assert solved.validate_solution()
+    assert all(given in (0, value) for given, value in zip(sudoku.cells, solved.cells))